@@ -0,0 +1,380 @@
+# Micro-benchmarks for the games, run headless:  python benchmarks.py [name ...]
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+
+def _random_games(cols, rows, count, seed=0):
+    # Each game is the list of (row, col, piece) drops of a random game played to the end
+    import connectfour
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        board = [[0] * cols for _ in range(rows)]
+        heights = [rows - 1] * cols
+        drops = []
+        piece = 1
+        while True:
+            open_cols = [c for c in range(cols) if heights[c] >= 0]
+            if not open_cols:
+                break
+            col = rng.choice(open_cols)
+            row = heights[col]
+            heights[col] -= 1
+            board[row][col] = piece
+            drops.append((row, col, piece))
+            if connectfour.winning_move_at(board, row, col, piece):
+                break
+            piece = 3 - piece
+        games.append(drops)
+    return games
+
+def _replay(cols, rows, games, check):
+    start = time.perf_counter()
+    for drops in games:
+        board = [[0] * cols for _ in range(rows)]
+        for row, col, piece in drops:
+            board[row][col] = piece
+            check(board, row, col, piece)
+    return time.perf_counter() - start
+
+def bench_connectfour_win():
+    import connectfour
+    print('Connect Four win check: full scan vs last move')
+    for cols, rows, count in ((7, 6, 500), (20, 15, 50), (40, 30, 10)):
+        games = _random_games(cols, rows, count)
+        moves = sum(len(g) for g in games)
+        full = _replay(cols, rows, games, lambda b, r, c, p: connectfour.winning_move(b, p))
+        last = _replay(cols, rows, games, connectfour.winning_move_at)
+        print(f'  {cols}x{rows}: {moves} moves  full {full * 1e6 / moves:8.1f} us/move'
+              f'  last move {last * 1e6 / moves:6.2f} us/move  ({full / last:.0f}x)')
+
+def bench_tictactoe_frames():
+    # One animate_symbol frame, uncached (fonts, grid, symbols and button rebuilt, as every frame
+    # used to do) against cached (background blit plus the animated stroke)
+    import pygame
+    import tictactoe
+    print('Tic-Tac-Toe animation frame: uncached vs cached')
+    for n, k, frames in ((3, 3, 300), (15, 5, 100)):
+        tictactoe.configure(n, k)
+        board = tictactoe.new_board()
+        rng = random.Random(0)
+        cells = [(x, y) for y in range(n) for x in range(n)]
+        rng.shuffle(cells)
+        for i, (x, y) in enumerate(cells[:n * n // 2]):
+            board.rows[y][x] = 'XO'[i % 2]
+        board_rect = tictactoe.get_board_rect()
+        cell_size = board_rect.width // n
+
+        start = time.perf_counter()
+        for i in range(frames):
+            tictactoe.clear_caches()
+            tictactoe.score_font = pygame.font.SysFont('arial', 32, bold=True)
+            tictactoe.btn_font = pygame.font.SysFont('arial', 26, bold=True)
+            tictactoe.draw_frame(board)
+            tictactoe.draw_circle(n - 1, n - 1, (i % 18 + 1) / 18, board_rect, cell_size)
+            pygame.display.flip()
+        uncached = (time.perf_counter() - start) / frames
+
+        tictactoe.draw_frame(board)
+        background = tictactoe.screen.copy()
+        start = time.perf_counter()
+        for i in range(frames):
+            tictactoe.screen.blit(background, (0, 0))
+            tictactoe.draw_circle(n - 1, n - 1, (i % 18 + 1) / 18, board_rect, cell_size)
+            pygame.display.flip()
+        cached = (time.perf_counter() - start) / frames
+
+        start = time.perf_counter()
+        for i in range(frames):
+            tictactoe.draw_frame(board)
+            pygame.display.flip()
+        redraw = (time.perf_counter() - start) / frames
+        print(f'  {n}x{n}: uncached {uncached * 1e3:6.2f} ms/frame  cached {cached * 1e3:5.2f} ms/frame'
+              f'  ({uncached / cached:.0f}x)  full redraw from sprites {redraw * 1e3:5.2f} ms')
+
+def bench_freecell_deals():
+    # Headless dealing: FreecellGame only builds the int state, no card objects or rects
+    import freecell
+    print('Freecell deals')
+    count = 20000
+    for ms in (False, True):
+        start = time.perf_counter()
+        for n in range(1, count + 1):
+            freecell.FreecellGame(n, ms)
+        elapsed = time.perf_counter() - start
+        print(f'  {"Microsoft" if ms else "seeded"} numbering: {count / elapsed:8.0f} deals/s')
+
+def bench_freecell_cards():
+    # All 52 faces per frame: rendered as draw used to (two text renders and a rotate per card)
+    # against blits from the card atlas
+    import pygame
+    import freecell
+    print('Freecell card faces: rendered vs atlas')
+    screen = pygame.display.set_mode((freecell.BASE_SCREEN_WIDTH, freecell.BASE_SCREEN_HEIGHT))
+    atlas = freecell.CARD_ATLAS
+    frames = 100
+    for scale in (1.0, 1.5):
+        positions = [(c % 13 * 50, c // 13 * 150) for c in range(52)]
+        start = time.perf_counter()
+        for _ in range(frames):
+            for c, pos in enumerate(positions):
+                rect = pygame.Rect(pos, (int(freecell.CARD_WIDTH * scale), int(freecell.CARD_HEIGHT * scale)))
+                atlas.render(screen, rect, c, atlas.NORMAL, scale)
+        rendered = (time.perf_counter() - start) / frames
+        start = time.perf_counter()
+        atlas.face(0, atlas.NORMAL, scale)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(frames):
+            for c, pos in enumerate(positions):
+                screen.blit(atlas.face(c, atlas.NORMAL, scale), pos)
+        blitted = (time.perf_counter() - start) / frames
+        print(f'  scale {scale}: rendered {rendered * 1e3:6.2f} ms/frame  atlas {blitted * 1e3:5.2f} ms/frame'
+              f'  ({rendered / blitted:.0f}x)  atlas build {build * 1e3:5.1f} ms')
+
+def bench_freecell_resume():
+    # Restoring a saved game: read the file, deal, replay the moves on the int state
+    import tempfile
+    import freecell
+    print('Freecell resume from a saved game')
+    rng = random.Random(0)
+    path = os.path.join(tempfile.mkdtemp(), 'save.bin')
+    for length in (50, 150, 300):
+        # Random play, on a new deal whenever it gets stuck before `length` moves
+        moves = []
+        while len(moves) < length:
+            game = freecell.FreecellGame(rng.randint(1, freecell.MAX_DEAL))
+            for i in range(length):
+                moves = freecell.legal_moves(game.state)
+                if not moves:
+                    break
+                if i % 3 == 0:
+                    game.begin_undo_group()
+                game.do_move(rng.choice(moves))
+            moves = [m for g in game.undo_stack for m in g]
+        freecell.save_session(game, path)
+        runs = 200
+        start = time.perf_counter()
+        for _ in range(runs):
+            freecell.FreecellGame.resume(path)
+        elapsed = (time.perf_counter() - start) / runs
+        print(f'  {len(moves):3d} moves, {os.path.getsize(path):5d} bytes: {elapsed * 1e3:.3f} ms')
+    os.remove(path)
+
+def _endgames(count):
+    # Positions right after the last move of a solution that is not a foundation move:
+    # from there on, every remaining card goes up by itself
+    import freecell
+    positions = []
+    number = 0
+    while len(positions) < count:
+        number += 1
+        state = freecell.deal(number)
+        moves, _ = freecell.solve(state, max_states=50000)
+        if not moves:
+            continue
+        last = max(i for i, m in enumerate(moves) if m[1] < freecell.FOUNDATION_SLOT)
+        for move in moves[:last + 1]:
+            state.apply(move)
+        positions.append(state)
+    return positions
+
+def _rescan_safe_moves(state):
+    # The same safe rule played the way auto_move_to_foundation used to loop: rescan all slots
+    # after every card
+    import freecell
+    played = []
+    while True:
+        moves = [m for m in freecell.foundation_moves(state) if freecell.safe_to_found(state, state.top(m[0]))]
+        if not moves:
+            return played
+        state.apply(moves[0])
+        played.append(moves[0])
+
+def bench_freecell_autoplay():
+    import freecell
+    print('Freecell safe autoplay on endgame positions: rescan per card vs one pass')
+    positions = _endgames(10)
+    runs = 200
+    cards = {}
+    for name, play in (('rescan', _rescan_safe_moves), ('one pass', freecell.play_safe_moves)):
+        start = time.perf_counter()
+        for _ in range(runs):
+            cards[name] = sum(len(play(state.copy())) for state in positions) / len(positions)
+        elapsed = (time.perf_counter() - start) / runs / len(positions)
+        print(f'  {name:8s}: {cards[name]:4.1f} cards up per position  {elapsed * 1e6:6.1f} us')
+    assert cards['rescan'] == cards['one pass']
+    print(f'  animation: {cards["rescan"] * freecell.ANIM_DURATION:.1f} s of blocking loops before,'
+          f' {freecell.ANIM_DURATION + cards["one pass"] * freecell.AUTO_STAGGER:.1f} s as one staggered sequence')
+
+def bench_field_runners_headless():
+    # Whole games simulated without pygame, from random command streams held for a few ticks
+    import field_runners_engine as engine
+    print('Field Runners headless simulation')
+    rng = random.Random(0)
+    games = 10
+    streams = []
+    for _ in range(games):
+        commands, command = [], engine.STAY
+        for _ in range(1200):  # 20 s of play at most
+            if rng.random() < 0.05:
+                command = rng.choice((engine.LEFT, engine.STAY, engine.RIGHT))
+            commands.append(command)
+        streams.append(commands)
+    start = time.perf_counter()
+    ticks = 0
+    for seed, commands in enumerate(streams):
+        ticks += engine.World(seed).run(commands).frame
+    elapsed = time.perf_counter() - start
+    print(f'  {games} games, {ticks / games:.0f} ticks each: {games / elapsed:6.0f} games/s'
+          f'  {ticks / elapsed:8.0f} ticks/s  ({ticks / elapsed / engine.FPS:.0f}x real time)')
+
+def _crowded_world(enemies, blocks, bullets, seed=0, world_class=None):
+    # Targets spread over the field, bullets in flight over the whole width
+    import field_runners_engine as engine
+    rng = random.Random(seed)
+    world = (world_class or engine.World)(seed)
+    world.regiment.soldiers = engine.REGIMENT_MAX_SOLDIERS
+    items = [], [], []
+    for _ in range(enemies):
+        items[0].append(engine.Enemy(rng.uniform(0, engine.WIDTH), rng.uniform(-30, engine.REGIMENT_Y - 80),
+                                          engine.ENEMY_SPEED_BASE, rng.randint(1, 50)))
+    for _ in range(blocks):
+        items[1].append(engine.Block(rng.uniform(0, engine.WIDTH), rng.uniform(-40, engine.REGIMENT_Y - 80),
+                                         rng.randint(engine.BLOCK_NEGATIVE_MIN, engine.BLOCK_NEGATIVE_MAX),
+                                         engine.BLOCK_SPEED_BASE))
+    for _ in range(bullets):
+        items[2].append(engine.Bullet(rng.uniform(0, engine.WIDTH), rng.uniform(-20, engine.REGIMENT_Y),
+                                           engine.BULLET_SPEED, rng.randint(1, 3)))
+    world.enemies, world.blocks, world.bullets = items
+    return world
+
+def _pairwise_collisions(world):
+    # What handle_collisions used to do: every bullet against every enemy and block, list.remove on hits
+    import field_runners_engine as engine
+    for b in list(world.bullets):
+        br = b.box()
+        for e in list(world.enemies):
+            if engine.collide(br, e.box()):
+                e.hp -= b.damage
+                world.bullets.remove(b)
+                if e.hp <= 0:
+                    world.enemies.remove(e)
+                    world.score += 10
+                break
+        else:
+            for bl in list(world.blocks):
+                if engine.collide(br, bl.box()):
+                    bl.on_hit(b.damage)
+                    world.bullets.remove(b)
+                    break
+    rr = world.regiment.box()
+    for e in list(world.enemies):
+        if engine.collide(rr, e.box()) or e.y > world.regiment.y:
+            world.enemies.remove(e)
+            world.regiment.soldiers = max(0, world.regiment.soldiers - e.hp)
+    for bl in list(world.blocks):
+        if engine.collide(rr, bl.box()) or bl.y > world.regiment.y:
+            world.regiment.soldiers = max(0, min(engine.REGIMENT_MAX_SOLDIERS, world.regiment.soldiers + bl.value))
+            world.blocks.remove(bl)
+
+def bench_field_runners_collisions():
+    import copy
+    import field_runners_engine as engine
+    print('Field Runners collisions: all pairs vs spatial hash')
+    for enemies, blocks, bullets in ((10, 5, 340), (200, 50, 340), (500, 100, 1000)):
+        world = _crowded_world(enemies, blocks, bullets)
+        runs = 20
+        results = {}
+        for name, handle in (('pairs', _pairwise_collisions), ('grid', engine.World.handle_collisions)):
+            copies = [copy.deepcopy(world) for _ in range(runs)]
+            start = time.perf_counter()
+            for w in copies:
+                handle(w)
+            results[name] = ((time.perf_counter() - start) / runs,
+                             (w.score, len(w.bullets), len(w.enemies), [e.hp for e in w.enemies]))
+        assert results['pairs'][1] == results['grid'][1]
+        pairs, grid = results['pairs'][0], results['grid'][0]
+        print(f'  {enemies:3d} enemies {blocks:3d} blocks {bullets:4d} bullets: pairs {pairs * 1e3:7.2f} ms'
+              f'  grid {grid * 1e3:5.2f} ms  ({pairs / grid:.0f}x)')
+
+def bench_field_runners_arrays():
+    # Whole ticks on crowded fields, 1x being about a late game (340 bullets in flight)
+    import field_runners_engine as engine
+    try:
+        from field_runners_arrays import ArrayWorld
+    except ImportError:
+        print('Field Runners NumPy backend: NumPy is not installed')
+        return
+    print(f'Field Runners tick: objects vs NumPy arrays (frame budget {1000 / engine.FPS:.1f} ms)')
+    for scale in (1, 10, 20):
+        enemies, blocks, bullets = 30 * scale, 10 * scale, 340 * scale
+        ticks = 30
+        times = {}
+        worlds = {}
+        for name, world_class in (('objects', engine.World), ('arrays', ArrayWorld)):
+            world = worlds[name] = _crowded_world(enemies, blocks, bullets, world_class=world_class)
+            start = time.perf_counter()
+            for _ in range(ticks):
+                world.step(engine.STAY)
+            times[name] = (time.perf_counter() - start) / ticks
+        objects, arrays = worlds['objects'], worlds['arrays']
+        assert (objects.score, objects.regiment.soldiers, len(objects.bullets), [e.hp for e in objects.enemies]) == \
+               (arrays.score, arrays.regiment.soldiers, len(arrays.bullets), [e.hp for e in arrays.enemies])
+        print(f'  {scale:2d}x ({bullets:4d} bullets {enemies:3d} enemies {blocks:3d} blocks):'
+              f'  objects {times["objects"] * 1e3:6.2f} ms  arrays {times["arrays"] * 1e3:5.2f} ms'
+              f'  ({times["objects"] / times["arrays"]:.1f}x)')
+
+def bench_field_runners_batch():
+    # Many games stepped together on (games, entities) arrays, checked against World on a sample
+    import field_runners_engine as engine
+    try:
+        import numpy as np
+        from field_runners_arrays import WorldBatch
+    except ImportError:
+        print('Field Runners batch: NumPy is not installed')
+        return
+    print('Field Runners headless batch')
+    rng = random.Random(0)
+    for games in (100, 1000, 4000):
+        commands = np.empty((games, 1200), np.int64)  # 20 s of play at most
+        for g in range(games):
+            command = engine.STAY
+            for t in range(commands.shape[1]):
+                if rng.random() < 0.05:
+                    command = rng.choice((engine.LEFT, engine.STAY, engine.RIGHT))
+                commands[g, t] = command
+        start = time.perf_counter()
+        batch = WorldBatch(range(games)).run(commands)
+        elapsed = time.perf_counter() - start
+        for g in range(0, games, games // 10):
+            world = engine.World(g).run(commands[g].tolist())
+            assert (world.frame, world.score, world.regiment.soldiers, world.regiment.x) == \
+                   (batch.frames[g], batch.score[g], batch.soldiers[g], batch.x[g])
+        ticks = int(batch.frames.sum())
+        print(f'  {games:4d} games, {ticks / games:.0f} ticks each: {games / elapsed:6.0f} games/s'
+              f'  {ticks / elapsed:8.0f} ticks/s')
+
+
+BENCHMARKS = {
+    'connectfour_win': bench_connectfour_win,
+    'tictactoe_frames': bench_tictactoe_frames,
+    'freecell_deals': bench_freecell_deals,
+    'freecell_cards': bench_freecell_cards,
+    'freecell_resume': bench_freecell_resume,
+    'freecell_autoplay': bench_freecell_autoplay,
+    'field_runners_headless': bench_field_runners_headless,
+    'field_runners_collisions': bench_field_runners_collisions,
+    'field_runners_arrays': bench_field_runners_arrays,
+    'field_runners_batch': bench_field_runners_batch,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -1,9 +1,14 @@
+import os
 import pygame
 import sys
 import time
+from connectfour_engine import AIPlayer
+import connectfour_book
 
 # Constants
 COLS, ROWS = 7, 6
+CONNECT = 4  # tokens in a row needed to win
+AI_TIME_BUDGET = 0.05  # seconds of search per computer move
 BG_COLOR = (30, 40, 60)
 BOARD_COLOR = (20, 60, 120)
 PLAYER1_COLOR = (220, 60, 60)
@@ -21,6 +26,18 @@ score_1 = 0
 score_2 = 0
 
 present_surface = None  # Will be set by launcher if running from launcher
+REPLAY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'connectfour_replay.txt')
+
+# Static board layer (background, frame, holes), rendered once per window size
+board_layer = None
+board_layer_key = None
+btn_fonts = {}  # restart button font per size, SysFont is too slow to call every frame
+
+def configure(cols=7, rows=6, connect=4):
+    # Board size and line length are chosen at runtime (e.g. 20x15, connect 5)
+    global COLS, ROWS, CONNECT
+    COLS, ROWS, CONNECT = cols, rows, connect
+    invalidate_board_layer()
 
 def create_board():
     return [[0 for _ in range(COLS)] for _ in range(ROWS)]
@@ -29,29 +46,47 @@ def get_sizes():
     width, height = screen.get_width(), screen.get_height()
     board_size = min(width, height - 60)
     squaresize = board_size // max(COLS, ROWS)
-    radius = squaresize // 2 - max(6, squaresize // 16)
+    radius = max(1, squaresize // 2 - max(min(6, squaresize // 8), squaresize // 16))
     offset_x = (width - squaresize*COLS) // 2
     offset_y = (height - squaresize*ROWS) // 2
     return width, height, squaresize, radius, offset_x, offset_y
 
-def draw_board(board, selected_col=None, surface=None, hover_y=None):
+def invalidate_board_layer():
+    # Called on VIDEORESIZE (and when the board size changes)
+    global board_layer, board_layer_key
+    board_layer = None
+    board_layer_key = None
+
+def get_board_layer():
+    global board_layer, board_layer_key
+    width, height, squaresize, radius, offset_x, offset_y = get_sizes()
+    key = (width, height, COLS, ROWS)
+    if board_layer is None or board_layer_key != key:
+        board_layer = pygame.Surface((width, height)).convert()
+        board_layer.fill(BG_COLOR)
+        pygame.draw.rect(board_layer, BOARD_COLOR, (offset_x, offset_y, squaresize*COLS, squaresize*ROWS))
+        half = squaresize // 2
+        for r in range(ROWS):
+            for c in range(COLS):
+                pygame.draw.circle(board_layer, EMPTY_COLOR, (offset_x + c*squaresize + half, offset_y + r*squaresize + half), radius)
+        board_layer_key = key
+    return board_layer
+
+def draw_board(state, selected_col=None, surface=None, hover_y=None):
     if surface is None:
         surface = screen
+    board = state.board
     _, _, squaresize, radius, offset_x, offset_y = get_sizes()
-    surface.fill(BG_COLOR)
-    # Draw board background
-    for c in range(COLS):
-        for r in range(ROWS):
-            rect = pygame.Rect(offset_x + c*squaresize, offset_y + r*squaresize, squaresize, squaresize)
-            pygame.draw.rect(surface, BOARD_COLOR, rect)
-            pygame.draw.circle(surface, EMPTY_COLOR, (offset_x + c*squaresize + squaresize//2, offset_y + r*squaresize + squaresize//2), radius)
-    # Draw tokens
-    for c in range(COLS):
-        for r in range(ROWS):
-            if board[r][c] == 1:
-                pygame.draw.circle(surface, PLAYER1_COLOR, (offset_x + c*squaresize + squaresize//2, offset_y + r*squaresize + squaresize//2), radius)
-            elif board[r][c] == 2:
-                pygame.draw.circle(surface, PLAYER2_COLOR, (offset_x + c*squaresize + squaresize//2, offset_y + r*squaresize + squaresize//2), radius)
+    # Blit the cached board, then only the tokens on top
+    surface.blit(get_board_layer(), (0, 0))
+    cell_colors = (None, PLAYER1_COLOR, PLAYER2_COLOR)
+    half = squaresize // 2
+    for r in range(ROWS):
+        row = board[r]
+        y = offset_y + r*squaresize + half
+        for c in range(COLS):
+            if row[c]:
+                pygame.draw.circle(surface, cell_colors[row[c]], (offset_x + c*squaresize + half, y), radius)
     # Draw selection indicator as a floating token
     if selected_col is not None and 0 <= selected_col < COLS:
         # If hover_y is not provided, default to above the board
@@ -60,11 +95,7 @@ def draw_board(board, selected_col=None, surface=None, hover_y=None):
         else:
             # Clamp hover_y to the board area
             token_y = min(max(hover_y, offset_y + radius), offset_y + (ROWS-1)*squaresize + squaresize//2)
-        # Determine whose turn it is by counting tokens
-        count1 = sum(cell == 1 for row in board for cell in row)
-        count2 = sum(cell == 2 for row in board for cell in row)
-        turn = 1 if count1 == count2 else 2
-        color = PLAYER1_COLOR if turn == 1 else PLAYER2_COLOR
+        color = PLAYER1_COLOR if state.turn == 1 else PLAYER2_COLOR
         pygame.draw.circle(surface, color, (offset_x + selected_col*squaresize + squaresize//2, int(token_y)-radius*2), radius)
     draw_scores(squaresize, offset_x, offset_y, surface=surface)
     return draw_restart_button(squaresize, offset_x, offset_y, surface=surface)
@@ -74,13 +105,18 @@ def draw_scores(squaresize, offset_x, offset_y, surface=None):
         surface = screen
     x_text = small_font.render(f"Rouge: {score_1}", True, PLAYER1_COLOR)
     o_text = small_font.render(f"Bleu: {score_2}", True, PLAYER2_COLOR)
-    surface.blit(x_text, (offset_x, offset_y - squaresize + 10))
-    surface.blit(o_text, (offset_x + squaresize*COLS - o_text.get_width(), offset_y - squaresize + 10))
+    # Keep the scores above the board even when the cells are small
+    y = min(offset_y - squaresize + 10, offset_y - x_text.get_height() - 4)
+    surface.blit(x_text, (offset_x, y))
+    surface.blit(o_text, (offset_x + squaresize*COLS - o_text.get_width(), y))
 
 def draw_restart_button(squaresize, offset_x, offset_y, surface=None):
     if surface is None:
         surface = screen
-    btn_font = pygame.font.SysFont('arial', max(18, squaresize//5), bold=True)
+    size = max(18, squaresize//5)
+    if size not in btn_fonts:
+        btn_fonts[size] = pygame.font.SysFont('arial', size, bold=True)
+    btn_font = btn_fonts[size]
     text = btn_font.render("Recommencer", True, (255,255,255))
     padding = int(squaresize * 0.18)
     btn_w, btn_h = text.get_width() + 2*padding, text.get_height() + padding
@@ -103,32 +139,158 @@ def drop_piece(board, row, col, piece):
     board[row][col] = piece
 
 def winning_move(board, piece):
+    rows, cols = len(board), len(board[0])
+    k = CONNECT
     # Horizontal
-    for r in range(ROWS):
-        for c in range(COLS-3):
-            if all(board[r][c+i] == piece for i in range(4)):
+    for r in range(rows):
+        for c in range(cols-k+1):
+            if all(board[r][c+i] == piece for i in range(k)):
                 return True
     # Vertical
-    for c in range(COLS):
-        for r in range(ROWS-3):
-            if all(board[r+i][c] == piece for i in range(4)):
+    for c in range(cols):
+        for r in range(rows-k+1):
+            if all(board[r+i][c] == piece for i in range(k)):
                 return True
     # Positive diagonal
-    for r in range(ROWS-3):
-        for c in range(COLS-3):
-            if all(board[r+i][c+i] == piece for i in range(4)):
+    for r in range(rows-k+1):
+        for c in range(cols-k+1):
+            if all(board[r+i][c+i] == piece for i in range(k)):
                 return True
     # Negative diagonal
-    for r in range(3, ROWS):
-        for c in range(COLS-3):
-            if all(board[r-i][c+i] == piece for i in range(4)):
+    for r in range(k-1, rows):
+        for c in range(cols-k+1):
+            if all(board[r-i][c+i] == piece for i in range(k)):
                 return True
     return False
 
+def winning_move_at(board, row, col, piece):
+    # Only the four lines through the last dropped disc can have changed
+    rows, cols = len(board), len(board[0])
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        count = 1
+        r, c = row + dr, col + dc
+        while 0 <= r < rows and 0 <= c < cols and board[r][c] == piece:
+            count += 1
+            r, c = r + dr, c + dc
+        r, c = row - dr, col - dc
+        while 0 <= r < rows and 0 <= c < cols and board[r][c] == piece:
+            count += 1
+            r, c = r - dr, c - dc
+        if count >= CONNECT:
+            return True
+    return False
+
 def is_full(board):
     return all(board[0][c] != 0 for c in range(COLS))
 
-def animate_drop(board, col, row, piece, squaresize=None, radius=None, offset_x=None, offset_y=None, surface=None):
+class GameState:
+    # Board plus turn, move count and history, so drawing never has to count tokens
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.board = create_board()
+        self.turn = 1
+        self.move_count = 0
+        self.history = []  # (row, col, piece) for every move played
+        self.redo_stack = []  # columns of undone moves
+        self.last_move = None
+        self.game_over = False
+        self.winner = None
+
+    def can_play(self, col):
+        return not self.game_over and 0 <= col < COLS and is_valid_location(self.board, col)
+
+    def play(self, col, keep_redo=False):
+        piece = self.turn
+        row = get_next_open_row(self.board, col)
+        drop_piece(self.board, row, col, piece)
+        self.history.append((row, col, piece))
+        if not keep_redo:
+            self.redo_stack = []
+        self.move_count += 1
+        self.last_move = (row, col)
+        if winning_move_at(self.board, row, col, piece):
+            self.game_over = True
+            self.winner = piece
+        elif self.move_count == ROWS * COLS:
+            self.game_over = True
+            self.winner = None
+        self.turn = 2 if piece == 1 else 1
+        return row
+
+    def undo(self):
+        if not self.history:
+            return None
+        row, col, piece = self.history.pop()
+        self.board[row][col] = 0
+        self.redo_stack.append(col)
+        self.move_count -= 1
+        self.last_move = self.history[-1][:2] if self.history else None
+        self.turn = piece
+        self.game_over = False
+        self.winner = None
+        return row, col, piece
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        col = self.redo_stack.pop()
+        return self.play(col, keep_redo=True)
+
+    def export_replay(self):
+        # e.g. "7x6x4:3,3,4,2" -> board size, line length, then the columns played
+        return f"{COLS}x{ROWS}x{CONNECT}:" + ",".join(str(col) for _, col, _ in self.history)
+
+    @classmethod
+    def from_replay(cls, text):
+        size, _, moves = text.strip().partition(':')
+        cols, rows, connect = (int(v) for v in size.split('x'))
+        configure(cols, rows, connect)
+        state = cls()
+        for col in moves.split(',') if moves else []:
+            state.play(int(col))
+        return state
+
+def play_move(state, col, squaresize=None, radius=None, offset_x=None, offset_y=None, surface=None):
+    # Animate and drop the current player's piece, update scores
+    global score_1, score_2
+    row = get_next_open_row(state.board, col)
+    animate_drop(state, col, row, state.turn, squaresize, radius, offset_x, offset_y, surface=surface)
+    state.play(col)
+    if state.winner == 1:
+        score_1 += 1
+    elif state.winner == 2:
+        score_2 += 1
+
+def undo_move(state, vs_ai=False):
+    # Take back a move (against the computer, back to the human's turn), scores follow
+    global score_1, score_2
+    while state.history:
+        if state.winner == 1:
+            score_1 -= 1
+        elif state.winner == 2:
+            score_2 -= 1
+        state.undo()
+        if not vs_ai or state.turn == 1:
+            break
+
+def redo_move(state, vs_ai=False):
+    global score_1, score_2
+    while state.redo_stack:
+        state.redo()
+        if state.winner == 1:
+            score_1 += 1
+        elif state.winner == 2:
+            score_2 += 1
+        if not vs_ai or state.turn == 1 or state.game_over:
+            break
+
+def export_replay(state, path=REPLAY_PATH):
+    with open(path, 'w') as f:
+        f.write(state.export_replay() + '\n')
+
+def animate_drop(state, col, row, piece, squaresize=None, radius=None, offset_x=None, offset_y=None, surface=None):
     if surface is None:
         surface = screen
     if squaresize is None or radius is None or offset_x is None or offset_y is None:
@@ -146,7 +308,7 @@ def animate_drop(board, col, row, piece, squaresize=None, radius=None, offset_x=
         if t > 0.92:
             bounce = (1 - (t - 0.92) / 0.08)
             y = min(y - 12 * bounce * (1 - bounce), end_y)
-        draw_board(board, surface=surface)
+        draw_board(state, surface=surface)
         color = PLAYER1_COLOR if piece == 1 else PLAYER2_COLOR
         pygame.draw.circle(surface, color, (x, int(y)), radius)
         # --- Use present_surface callback if set ---
@@ -157,22 +319,27 @@ def animate_drop(board, col, row, piece, squaresize=None, radius=None, offset_x=
         clock.tick(fps)
     # Final position will be drawn by main loop
 
-def main():
+def main(vs_ai=False, cols=7, rows=6, connect=4):
     global score_1, score_2, screen
-    board = create_board()
-    game_over = False
-    turn = 1
+    configure(cols, rows, connect)
+    state = GameState()
     selected_col = None
     hover_y = None
-    winner = None
     running = True
     btn_rect = None
+    ai = AIPlayer(AI_TIME_BUDGET, book=connectfour_book.load_book()) if vs_ai else None
 
     while running:
-        btn_rect = draw_board(board, selected_col, hover_y=hover_y)
+        # Computer plays Blue: start a background search, play it once it is done
+        if ai and state.turn == 2 and not state.game_over:
+            ai.start(state.board, 2, CONNECT)
+            col = ai.poll()
+            if col is not None:
+                play_move(state, col)
+        btn_rect = draw_board(state, selected_col, hover_y=hover_y)
         _, _, squaresize, radius, offset_x, offset_y = get_sizes()
-        if game_over:
-            msg = f"{'Rouge' if winner == 1 else 'Bleu'} gagne !" if winner else "Match nul !"
+        if state.game_over:
+            msg = f"{'Rouge' if state.winner == 1 else 'Bleu'} gagne !" if state.winner else "Match nul !"
             text = small_font.render(msg, True, (0, 200, 0))
             screen.blit(text, (offset_x + squaresize*COLS//2 - text.get_width()//2, offset_y + squaresize*ROWS//2 - text.get_height()//2))
         pygame.display.flip()
@@ -182,6 +349,17 @@ def main():
                 running = False
             elif event.type == pygame.VIDEORESIZE:
                 screen = pygame.display.set_mode((event.w, event.h), pygame.RESIZABLE)
+                invalidate_board_layer()
+            elif event.type == pygame.KEYDOWN:
+                # P: undo, N: redo, E: export the game as a replay file
+                if event.key in (pygame.K_p, pygame.K_n) and ai:
+                    ai.cancel()
+                if event.key == pygame.K_p:
+                    undo_move(state, vs_ai)
+                elif event.key == pygame.K_n:
+                    redo_move(state, vs_ai)
+                elif event.key == pygame.K_e:
+                    export_replay(state)
             elif event.type == pygame.MOUSEMOTION:
                 mx, my = event.pos
                 _, _, squaresize, radius, offset_x, offset_y = get_sizes()
@@ -196,34 +374,27 @@ def main():
                 mx, my = event.pos
                 _, _, squaresize, radius, offset_x, offset_y = get_sizes()
                 if btn_rect and btn_rect.collidepoint(mx, my):
-                    board = create_board()
-                    game_over = False
-                    turn = 1
-                    winner = None
+                    state.reset()
+                    if ai:
+                        ai.cancel()
                     continue
-                if game_over:
+                if state.game_over or (ai and state.turn == 2):
                     continue
                 # Allow clicking anywhere in the board area (not just the top row)
                 if offset_x <= mx < offset_x + squaresize*COLS and offset_y <= my < offset_y + squaresize*ROWS:
                     col = int((mx - offset_x) // squaresize)
-                    if 0 <= col < COLS and is_valid_location(board, col):
-                        row = get_next_open_row(board, col)
-                        animate_drop(board, col, row, turn, squaresize, radius, offset_x, offset_y)
-                        drop_piece(board, row, col, turn)
-                        if winning_move(board, turn):
-                            winner = turn
-                            game_over = True
-                            if turn == 1:
-                                score_1 += 1
-                            else:
-                                score_2 += 1
-                        elif is_full(board):
-                            winner = None
-                            game_over = True
-                        turn = 2 if turn == 1 else 1
+                    if state.can_play(col):
+                        play_move(state, col, squaresize, radius, offset_x, offset_y)
     pygame.quit()
     sys.exit()
 
 if __name__ == '__main__':
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description='Connect Four')
+    parser.add_argument('--ai', action='store_true', help='play against the computer')
+    parser.add_argument('--cols', type=int, default=7)
+    parser.add_argument('--rows', type=int, default=6)
+    parser.add_argument('--connect', type=int, default=4)
+    args = parser.parse_args()
+    main(vs_ai=args.ai, cols=args.cols, rows=args.rows, connect=args.connect)
     sys.exit()
\ No newline at end of file
@@ -0,0 +1,147 @@
+# Connect Four opening book.
+# The book is a sorted array of 64-bit records (canonical position key << 8 | column) behind a
+# small header. It is memory-mapped and searched in place, so loading it costs nothing.
+#
+# Build it with:  python connectfour_book.py --plies 8 --depth 10
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+
+from connectfour_engine import BitBoard, Searcher, TranspositionTable, COLS, ROWS, CONNECT
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'connectfour_book.bin')
+MAGIC = b'C4BK'
+HEADER = struct.Struct('<4sBBBB')  # magic, cols, rows, connect, plies
+RECORD = struct.Struct('<Q')
+
+
+def position_key(board):
+    # Unique key for a position: stones of the side to move + all stones (Pascal Pons' encoding)
+    both = board.masks[0] | board.masks[1]
+    to_move = board.masks[0] if bin(both).count('1') % 2 == 0 else board.masks[1]
+    return to_move + both
+
+def mirror_key(key, cols=COLS, rows=ROWS):
+    # Each column of the key lives in its own rows+1 bits, so mirroring is a column swap
+    h = rows + 1
+    col_mask = (1 << h) - 1
+    mirrored = 0
+    for c in range(cols):
+        mirrored |= ((key >> (c * h)) & col_mask) << ((cols - 1 - c) * h)
+    return mirrored
+
+def canonical_key(board):
+    # Returns (key, mirrored): the smaller of the key and its mirror image
+    key = position_key(board)
+    mirrored = mirror_key(key, board.cols, board.rows)
+    if mirrored < key:
+        return mirrored, True
+    return key, False
+
+
+class OpeningBook:
+    def __init__(self, path=BOOK_PATH):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.cols, self.rows, self.connect, self.plies = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a Connect Four book')
+        self.count = (len(self.data) - HEADER.size) // RECORD.size
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def lookup(self, board):
+        # Best column for the position, or None when it is not in the book
+        if (board.cols, board.rows, board.connect) != (self.cols, self.rows, self.connect):
+            return None
+        key, mirrored = canonical_key(board)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            rec = RECORD.unpack_from(self.data, HEADER.size + mid * RECORD.size)[0]
+            if rec >> 8 < key:
+                lo = mid + 1
+            elif rec >> 8 > key:
+                hi = mid
+            else:
+                col = rec & 0xFF
+                return self.cols - 1 - col if mirrored else col
+        return None
+
+def load_book(path=BOOK_PATH):
+    # The book is optional: without it the AI simply searches every move
+    try:
+        return OpeningBook(path)
+    except (OSError, ValueError):
+        return None
+
+
+# --- Generator ---
+
+def book_positions(plies, cols=COLS, rows=ROWS, connect=CONNECT):
+    # Move sequences reaching every canonical, unfinished position with fewer than `plies` stones
+    seen = set()
+    frontier = [[]]
+    positions = []
+    for ply in range(plies):
+        next_frontier = []
+        for moves in frontier:
+            board = BitBoard(cols, rows, connect)
+            for i, col in enumerate(moves):
+                board.play(col, 1 + i % 2)
+            key, _ = canonical_key(board)
+            if key in seen:
+                continue
+            seen.add(key)
+            positions.append(moves)
+            piece = 1 + ply % 2
+            for col in range(cols):
+                if not board.can_play(col):
+                    continue
+                board.play(col, piece)
+                if not board.is_win(piece):
+                    next_frontier.append(moves + [col])
+                board.undo()
+        frontier = next_frontier
+    return positions
+
+def _solve_position(args):
+    moves, depth, cols, rows, connect = args
+    board = BitBoard(cols, rows, connect)
+    for i, col in enumerate(moves):
+        board.play(col, 1 + i % 2)
+    col = Searcher(TranspositionTable(1 << 14)).best_move(board, 1 + len(moves) % 2, time_budget=None, max_depth=depth)
+    key, mirrored = canonical_key(board)
+    if mirrored:
+        col = cols - 1 - col
+    return key << 8 | col
+
+def build_book(path=BOOK_PATH, plies=8, depth=10, cols=COLS, rows=ROWS, connect=CONNECT, processes=None):
+    positions = book_positions(plies, cols, rows, connect)
+    start = time.perf_counter()
+    jobs = [(moves, depth, cols, rows, connect) for moves in positions]
+    with multiprocessing.Pool(processes) as pool:
+        records = list(pool.imap_unordered(_solve_position, jobs, chunksize=16))
+    records.sort()
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, cols, rows, connect, plies))
+        for rec in records:
+            f.write(RECORD.pack(rec))
+    os.replace(tmp, path)
+    print(f'{len(records)} positions written to {path} in {time.perf_counter() - start:.1f}s')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the Connect Four opening book')
+    parser.add_argument('--plies', type=int, default=8, help='cover positions with fewer stones than this')
+    parser.add_argument('--depth', type=int, default=10, help='search depth used for each position')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--out', default=BOOK_PATH)
+    args = parser.parse_args()
+    build_book(args.out, args.plies, args.depth, processes=args.jobs)
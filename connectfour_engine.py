@@ -0,0 +1,386 @@
+# Bitboard backed Connect Four state.
+# No pygame import here, so the engine can be used headless for simulated games and AI search.
+import random
+import threading
+import time
+
+COLS, ROWS = 7, 6
+CONNECT = 4  # stones in a row needed to win
+
+_zobrist_cache = {}
+
+def zobrist_table(cols, rows):
+    # One random 64-bit key per (player, cell), fixed seed so hashes are stable between runs
+    key = (cols, rows)
+    if key not in _zobrist_cache:
+        rng = random.Random(0xC4)
+        size = cols * (rows + 1)
+        _zobrist_cache[key] = [[rng.getrandbits(64) for _ in range(size)] for _ in range(2)]
+    return _zobrist_cache[key]
+
+
+class BitBoard:
+    # Each column uses ROWS+1 bits (the extra sentinel bit stops lines wrapping between columns).
+    # Bit index of a cell is col*(ROWS+1) + height, height counted from the bottom.
+    # Python ints have no width limit, so large boards work the same way, just with wider masks.
+    def __init__(self, cols=COLS, rows=ROWS, connect=CONNECT):
+        self.cols = cols
+        self.rows = rows
+        self.connect = connect
+        self.h = rows + 1
+        self.masks = [0, 0]  # stones of player 1 and player 2
+        self.heights = [0] * cols
+        self.moves = []  # columns played, for undo
+        self.hash = 0  # Zobrist hash of the position
+        self.zobrist = zobrist_table(cols, rows)
+        bottom = sum(1 << (c * self.h) for c in range(cols))
+        self.full_mask = bottom * ((1 << rows) - 1)  # every playable cell, sentinels excluded
+
+    def copy(self):
+        other = BitBoard(self.cols, self.rows, self.connect)
+        other.masks = self.masks[:]
+        other.heights = self.heights[:]
+        other.moves = self.moves[:]
+        other.hash = self.hash
+        return other
+
+    @classmethod
+    def from_rows(cls, board, connect=CONNECT):
+        # Build from a list-of-lists board (row 0 at the top) as used by connectfour.py
+        rows, cols = len(board), len(board[0])
+        bb = cls(cols, rows, connect)
+        for c in range(cols):
+            for r in range(rows - 1, -1, -1):
+                piece = board[r][c]
+                if piece == 0:
+                    break
+                idx = c * bb.h + bb.heights[c]
+                bb.masks[piece - 1] |= 1 << idx
+                bb.hash ^= bb.zobrist[piece - 1][idx]
+                bb.heights[c] += 1
+        return bb
+
+    def can_play(self, col):
+        return self.heights[col] < self.rows
+
+    def play(self, col, piece):
+        # Drop a stone, returns the row index (row 0 at the top) where it landed
+        height = self.heights[col]
+        idx = col * self.h + height
+        self.masks[piece - 1] |= 1 << idx
+        self.hash ^= self.zobrist[piece - 1][idx]
+        self.heights[col] = height + 1
+        self.moves.append(col)
+        return self.rows - 1 - height
+
+    def undo(self):
+        col = self.moves.pop()
+        height = self.heights[col] - 1
+        idx = col * self.h + height
+        bit = 1 << idx
+        piece = 1 if self.masks[0] & bit else 2
+        self.masks[piece - 1] &= ~bit
+        self.hash ^= self.zobrist[piece - 1][idx]
+        self.heights[col] = height
+        return col, piece
+
+    def is_win(self, piece):
+        b = self.masks[piece - 1]
+        h = self.h
+        k = self.connect
+        # vertical, horizontal, and both diagonals
+        for s in (1, h, h - 1, h + 1):
+            # m marks the start of every run of `length` stones; double the run length while possible
+            m, length = b, 1
+            while 2 * length <= k:
+                m &= m >> (length * s)
+                length *= 2
+            if length < k:
+                m &= m >> ((k - length) * s)
+            if m:
+                return True
+        return False
+
+    def is_full(self):
+        return len(self.moves) == self.cols * self.rows
+
+    def threats(self, piece):
+        # Empty cells that would complete a line of `connect` stones for piece
+        b = self.masks[piece - 1]
+        h = self.h
+        k = self.connect
+        r = 0
+        for s in (h, h - 1, h + 1):
+            # the empty cell is at position j of the line, the other k-1 cells must be ours
+            for j in range(k):
+                m = -1
+                for i in range(k):
+                    if i > j:
+                        m &= b >> ((i - j) * s)
+                    elif i < j:
+                        m &= b << ((j - i) * s)
+                r |= m
+        # vertically only the cell on top of a stack can complete a line
+        m = b << 1
+        for i in range(2, k):
+            m &= b << i
+        r |= m
+        return r & self.full_mask & ~(self.masks[0] | self.masks[1])
+
+    def cell(self, row, col):
+        bit = 1 << (col * self.h + self.rows - 1 - row)
+        if self.masks[0] & bit:
+            return 1
+        if self.masks[1] & bit:
+            return 2
+        return 0
+
+    def __getitem__(self, row):
+        # Row view so drawing code written for list boards (board[r][c]) keeps working
+        if row < 0:
+            row += self.rows
+        if not 0 <= row < self.rows:
+            raise IndexError('board row out of range')
+        return [self.cell(row, c) for c in range(self.cols)]
+
+    def __iter__(self):
+        return (self[row] for row in range(self.rows))
+
+    def __len__(self):
+        return self.rows
+
+
+# --- Same API as connectfour.py, backed by a BitBoard ---
+
+def create_board(cols=COLS, rows=ROWS, connect=CONNECT):
+    return BitBoard(cols, rows, connect)
+
+def is_valid_location(board, col):
+    return board.can_play(col)
+
+def get_next_open_row(board, col):
+    if not board.can_play(col):
+        return None
+    return board.rows - 1 - board.heights[col]
+
+def drop_piece(board, row, col, piece):
+    # The stone always lands on top of the column; a different row means the caller is out of date
+    assert row == get_next_open_row(board, col), f'row {row} is not the open row of column {col}'
+    board.play(col, piece)
+
+def undo_piece(board):
+    return board.undo()
+
+def winning_move(board, piece):
+    return board.is_win(piece)
+
+def is_full(board):
+    return board.is_full()
+
+
+# --- Alpha-beta AI ---
+
+WIN_SCORE = 100000
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable:
+    # Fixed-size table indexed by the low bits of the Zobrist hash.
+    # An entry is replaced when it comes from an older search or was searched less deeply.
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.mask = size - 1
+        self.keys = [None] * size
+        self.entries = [None] * size  # (depth, flag, value, move, generation)
+        self.generation = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, key):
+        i = key & self.mask
+        if self.keys[i] == key:
+            return self.entries[i]
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        i = key & self.mask
+        old = self.entries[i]
+        if old is None or old[4] != self.generation or depth >= old[0] or self.keys[i] == key:
+            self.keys[i] = key
+            self.entries[i] = (depth, flag, value, move, self.generation)
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Searcher:
+    def __init__(self, tt=None):
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.nodes = 0
+        self.deadline = None
+        self.stop = None  # callable, True once the caller no longer wants the result
+        self.root_move = None
+
+    def evaluate(self, board, piece):
+        # Heuristic for cut-off positions: open threats, then stones in the centre column
+        opp = 3 - piece
+        score = 8 * (bin(board.threats(piece)).count('1') - bin(board.threats(opp)).count('1'))
+        center = ((1 << board.rows) - 1) << (board.cols // 2 * board.h)
+        score += bin(board.masks[piece - 1] & center).count('1') - bin(board.masks[opp - 1] & center).count('1')
+        return score
+
+    def negamax(self, board, depth, alpha, beta, piece, ply, order):
+        self.nodes += 1
+        # Leaf nodes pay for a threats() evaluation, so look at the clock often enough to stay on budget
+        if not self.nodes & 127 and (self.deadline is not None and time.perf_counter() > self.deadline
+                                     or self.stop is not None and self.stop()):
+            raise SearchTimeout()
+        alpha_orig = alpha
+        entry = self.tt.probe(board.hash)
+        tt_move = None
+        if entry is not None:
+            e_depth, flag, value, tt_move, _ = entry
+            # No cutoff at the root: the search must get to pick root_move, the table move only orders
+            if e_depth >= depth and ply > 0:
+                # Win scores are stored relative to the node, convert back to the root
+                if value > WIN_SCORE - 1000:
+                    value -= ply
+                elif value < -WIN_SCORE + 1000:
+                    value += ply
+                if flag == EXACT:
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+        if depth == 0:
+            return self.evaluate(board, piece)
+        opp = 3 - piece
+        best, best_col = -WIN_SCORE - 1, None
+        moves = order if tt_move is None else [tt_move] + [c for c in order if c != tt_move]
+        for col in moves:
+            if not board.can_play(col):
+                continue
+            board.play(col, piece)
+            if board.is_win(piece):
+                score = WIN_SCORE - ply
+            elif board.is_full():
+                score = 0
+            else:
+                score = -self.negamax(board, depth - 1, -beta, -alpha, opp, ply + 1, order)
+            board.undo()
+            if score > best:
+                best, best_col = score, col
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        if best_col is None:
+            return 0
+        if ply == 0:
+            self.root_move = best_col
+        stored = best
+        if stored > WIN_SCORE - 1000:
+            stored += ply
+        elif stored < -WIN_SCORE + 1000:
+            stored -= ply
+        if best <= alpha_orig:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(board.hash, depth, flag, stored, best_col)
+        return best
+
+    def best_move(self, board, piece, time_budget=0.05, max_depth=None, stop=None):
+        # Iterative deepening until the time budget runs out (or stop() says so), keeps the last
+        # completed depth
+        board = board.copy()
+        self.tt.new_search()
+        self.nodes = 0
+        self.deadline = time.perf_counter() + time_budget if time_budget else None
+        self.stop = stop
+        center = (board.cols - 1) / 2
+        order = sorted(range(board.cols), key=lambda c: abs(c - center))
+        legal = [c for c in order if board.can_play(c)]
+        if not legal:
+            return None
+        best_col = legal[0]
+        empty = board.cols * board.rows - len(board.moves)
+        max_depth = min(max_depth or empty, empty)
+        try:
+            for depth in range(1, max_depth + 1):
+                if self.deadline is not None and time.perf_counter() > self.deadline:
+                    break
+                self.root_move = None
+                score = self.negamax(board, depth, -WIN_SCORE - 1, WIN_SCORE + 1, piece, 0, order)
+                if self.root_move is not None:
+                    best_col = self.root_move
+                if abs(score) > WIN_SCORE - 1000:
+                    break  # forced result found
+        except SearchTimeout:
+            pass
+        self.deadline = None
+        self.stop = None
+        return best_col
+
+
+class AIPlayer:
+    # Runs the search on a worker thread so the render loop never waits on it.
+    # Positions found in the opening book (see connectfour_book.py) are answered without searching.
+    def __init__(self, time_budget=0.05, tt_size=1 << 16, book=None):
+        self.time_budget = time_budget
+        self.searcher = Searcher(TranspositionTable(tt_size))
+        self.book = book
+        self.thread = None
+        self.cancelled = None  # thread of a cancelled search, still winding down
+        self.pending = False
+        self.result = None
+
+    def start(self, board, piece, connect=CONNECT):
+        if self.pending:
+            return
+        if self.cancelled is not None:
+            # It shares the searcher and table with the new search; it stops within 128 nodes
+            self.cancelled.join()
+            self.cancelled = None
+        if not isinstance(board, BitBoard):
+            board = BitBoard.from_rows(board, connect)
+        self.pending = True
+        self.result = None
+        if self.book is not None:
+            col = self.book.lookup(board)
+            if col is not None and board.can_play(col):
+                self.result = col
+                return
+        self.thread = threading.Thread(target=self._run, args=(board.copy(), piece), daemon=True)
+        self.thread.start()
+
+    def _run(self, board, piece):
+        me = threading.current_thread()
+        col = self.searcher.best_move(board, piece, self.time_budget, stop=lambda: self.thread is not me)
+        if self.thread is me:
+            self.result = col
+
+    def busy(self):
+        return self.pending
+
+    def poll(self):
+        # Returns the chosen column once the search is done, None while it is still running
+        if not self.pending or (self.thread is not None and self.thread.is_alive()):
+            return None
+        self.pending = False
+        self.thread = None
+        return self.result
+
+    def cancel(self):
+        # Drop a running search (e.g. after a restart); its thread stops at the next clock check
+        if self.thread is not None and self.thread.is_alive():
+            self.cancelled = self.thread
+        self.pending = False
+        self.thread = None
+        self.result = None
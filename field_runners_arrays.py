@@ -0,0 +1,415 @@
+# Field Runners with the entities stored as NumPy arrays, one array per field (structure of arrays).
+# ArrayWorld runs one game with whole-array movement, culling and overlap tests, for crowded games.
+# WorldBatch runs many games at once, one row per game, for headless runs of thousands of games.
+# Same rules, same random draws, same results as field_runners_engine.World.
+# Only this module needs NumPy
+import random
+from dataclasses import fields
+
+import numpy as np
+
+from field_runners_engine import (BLOCK_POSITIVE_CAP, BLOCK_SIZE, BLOCK_SPEED_BASE, BLOCK_NEGATIVE_MAX,
+                                  BLOCK_NEGATIVE_MIN, BLOCK_SPAWN_EVERY_FRAMES, BULLET_RADIUS, BULLET_SPEED,
+                                  DIFFICULTY_RAMP, ENEMY_SIZE, ENEMY_SPAWN_EVERY_FRAMES, ENEMY_SPEED_BASE, FPS,
+                                  HEIGHT, MAX_BULLETS_PER_SECOND, REGIMENT_MAX_SOLDIERS, REGIMENT_RADIUS,
+                                  REGIMENT_SPEED, REGIMENT_START_SOLDIERS, REGIMENT_Y, WIDTH, Block, Bullet, Enemy,
+                                  World)
+
+
+class EntityArrays:
+    # The entities of one class, one array per dataclass field, in the order they were added
+    def __init__(self, cls, items=()):
+        self.cls = cls
+        self.fields = [(f.name, f.type) for f in fields(cls)]
+        for name, kind in self.fields:
+            setattr(self, name, np.array([getattr(item, name) for item in items], kind))
+
+    def __len__(self):
+        return len(self.x)
+
+    def extend(self, items):
+        if items:
+            for name, kind in self.fields:
+                added = np.array([getattr(item, name) for item in items], kind)
+                setattr(self, name, np.concatenate((getattr(self, name), added)))
+
+    def keep(self, mask):
+        if not mask.all():
+            for name, _ in self.fields:
+                setattr(self, name, getattr(self, name)[mask])
+
+    def objects(self):
+        columns = [getattr(self, name).tolist() for name, _ in self.fields]
+        return [self.cls(*values) for values in zip(*columns)]
+
+
+def corner(centre, size):
+    # Left (or top) of the boxes, truncated like int() in the entity box() methods
+    return np.trunc(centre - size / 2)
+
+def overlaps(ax, ay, aw, ah, bx, by, bw, bh):
+    # Pairwise collide() between the boxes of a (rows) and b (columns)
+    ax, ay = ax[:, None], ay[:, None]
+    return (ax < bx + bw) & (bx < ax + aw) & (ay < by + bh) & (by < ay + ah)
+
+
+class ArrayWorld(World):
+    # bullets, enemies and blocks read as lists of fresh objects (for drawing and checks) and can
+    # be assigned lists of objects; the simulation itself only touches the arrays
+
+    @property
+    def bullets(self):
+        return self.bullet_data.objects()
+
+    @bullets.setter
+    def bullets(self, bullets):
+        self.bullet_data = EntityArrays(Bullet, bullets)
+
+    @property
+    def enemies(self):
+        return self.enemy_data.objects()
+
+    @enemies.setter
+    def enemies(self, enemies):
+        self.enemy_data = EntityArrays(Enemy, enemies)
+
+    @property
+    def blocks(self):
+        return self.block_data.objects()
+
+    @blocks.setter
+    def blocks(self, blocks):
+        self.block_data = EntityArrays(Block, blocks)
+
+    def add_bullets(self, bullets):
+        self.bullet_data.extend(bullets)
+
+    def add_enemy(self, enemy):
+        self.enemy_data.extend([enemy])
+
+    def add_block(self, block):
+        self.block_data.extend([block])
+
+    def move(self):
+        bullets, enemies, blocks = self.bullet_data, self.enemy_data, self.block_data
+        bullets.y -= bullets.vy
+        bullets.keep(bullets.y >= -20)
+        enemies.y += enemies.speed
+        enemies.keep(enemies.y <= HEIGHT + 40)
+        blocks.y += blocks.speed
+        blocks.keep(blocks.y <= HEIGHT + 60)
+
+    def handle_collisions(self):
+        bullets, enemies, blocks = self.bullet_data, self.enemy_data, self.block_data
+        n_enemies = len(enemies)
+
+        # Every bullet against every target, enemies first then blocks, so the first overlapping
+        # column of a row is the target a bullet hits unless that enemy died earlier in the tick
+        size = np.concatenate((np.full(n_enemies, ENEMY_SIZE), np.full(len(blocks), BLOCK_SIZE)))
+        tx = corner(np.concatenate((enemies.x, blocks.x)), size)
+        ty = corner(np.concatenate((enemies.y, blocks.y)), size)
+        d = 2 * BULLET_RADIUS
+        hits = overlaps(corner(bullets.x, d), corner(bullets.y, d), d, d, tx, ty, size, size)
+        rows = np.flatnonzero(hits.any(axis=1))
+        if len(rows):
+            # Only the bullets that touch something are resolved one by one, in order
+            hp = enemies.hp.tolist()
+            values = blocks.value.tolist()
+            damage = bullets.damage.tolist()
+            spent = np.zeros(len(bullets), bool)
+            for row in rows.tolist():
+                for col in np.flatnonzero(hits[row]).tolist():
+                    if col >= n_enemies:
+                        values[col - n_enemies] = min(values[col - n_enemies] + damage[row], BLOCK_POSITIVE_CAP)
+                    elif hp[col] > 0:
+                        hp[col] -= damage[row]
+                        if hp[col] <= 0:
+                            self.score += 10
+                    else:
+                        continue
+                    spent[row] = True
+                    break
+            enemies.hp = np.array(hp, enemies.hp.dtype)
+            blocks.value = np.array(values, blocks.value.dtype)
+            bullets.keep(~spent)
+            enemies.keep(enemies.hp > 0)
+
+        regiment = self.regiment
+        rx, ry, rw, rh = regiment.box()
+        gone = overlaps(np.array([rx]), np.array([ry]), rw, rh, corner(enemies.x, ENEMY_SIZE),
+                        corner(enemies.y, ENEMY_SIZE), ENEMY_SIZE, ENEMY_SIZE)[0] | (enemies.y > regiment.y)
+        if gone.any():
+            # Every enemy has hp > 0, so clamping once at the end is the same as after each one
+            regiment.soldiers = max(0, regiment.soldiers - int(enemies.hp[gone].sum()))
+            enemies.keep(~gone)
+
+        gone = overlaps(np.array([rx]), np.array([ry]), rw, rh, corner(blocks.x, BLOCK_SIZE),
+                        corner(blocks.y, BLOCK_SIZE), BLOCK_SIZE, BLOCK_SIZE)[0] | (blocks.y > regiment.y)
+        if gone.any():
+            for value in blocks.value[gone].tolist():
+                if value < 0:
+                    regiment.soldiers = max(0, regiment.soldiers + value)
+                elif value > 0:
+                    regiment.soldiers = min(REGIMENT_MAX_SOLDIERS, regiment.soldiers + value)
+            blocks.keep(~gone)
+
+
+# --- Many games at once ---
+# Every regiment fires on the same frames (the fire timer does not depend on the game), so a volley
+# is one entity: up to MAX_BULLETS_PER_SECOND bullets sharing one box, whose damages are `hi` for the
+# first r bullets and `lo` for the rest. A volley only ever loses bullets from the front, so k (the
+# bullets used) is all its state. Its height is the same in every game and follows from its number.
+
+FIRE_PERIOD = FPS // MAX_BULLETS_PER_SECOND
+BULLET_START_Y = REGIMENT_Y - REGIMENT_RADIUS - 8  # where Regiment.try_fire puts new bullets
+VOLLEY_SPACING = BULLET_SPEED * FIRE_PERIOD
+VOLLEY_SLOTS = (BULLET_START_Y + 20) // VOLLEY_SPACING + 2  # more than can be on screen at once
+
+
+class SlotArrays:
+    # The entities of one kind in a batch: one (games, slots) array per field. An entity keeps its
+    # slot until it goes, a new one takes the first free slot; ids (spawn frames) keep list order
+    def __init__(self, games, slots, **kinds):
+        self.kinds = dict(kinds, alive=bool, id=np.int64)
+        for name, kind in self.kinds.items():
+            setattr(self, name, np.zeros((games, slots), kind))
+
+    def spawn(self, ident, **values):
+        if not (~self.alive).any(axis=1).all():
+            for name in self.kinds:
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate((array, np.zeros_like(array)), axis=1))
+        slot = (~self.alive).argmax(axis=1)
+        rows = np.arange(len(slot))
+        self.alive[rows, slot] = True
+        self.id[rows, slot] = ident
+        for name, value in values.items():
+            getattr(self, name)[rows, slot] = value
+
+    def take(self, rows):
+        for name in self.kinds:
+            setattr(self, name, getattr(self, name)[rows])
+
+    def live(self, size, bottom):
+        # Drop what fell below `bottom`, then the (rows, slots, lefts, tops) of what is left: the
+        # work of a tick is on these lists, not on every slot
+        rows, cols = np.nonzero(self.alive)
+        y = self.y[rows, cols]
+        below = y > bottom
+        if below.any():
+            self.alive[rows[below], cols[below]] = False
+            keep = ~below
+            rows, cols, y = rows[keep], cols[keep], y[keep]
+        return rows, cols, box_corner(self.x[rows, cols], size), box_corner(y, size)
+
+
+def damage_before(hi, lo, r, k):
+    # Damage of the first k bullets of a volley
+    return hi * np.minimum(k, r) + lo * np.maximum(k - r, 0)
+
+def rank_in_group(rows):
+    # Position of every entry among those of the same row, rows sorted
+    index = np.arange(len(rows))
+    start = np.r_[True, rows[1:] != rows[:-1]]
+    return index - np.maximum.accumulate(np.where(start, index, 0))
+
+def box_corner(centre, size):
+    # Left or top of the boxes, truncated like int() in box(); kept as floats, the values are whole
+    return np.trunc(centre - size / 2)
+
+
+class WorldBatch:
+    # Games from a list of seeds, stepped together; game g plays like World(seeds[g]) fed the same
+    # commands. frames, score, soldiers and x hold every game's state, rows the games still running
+    # (lost games stop, as World.run does); the entity arrays have one row per running game
+    def __init__(self, seeds):
+        self.seeds = list(seeds)
+        games = len(self.seeds)
+        self.rngs = [random.Random(seed) for seed in self.seeds]
+        self.frame = 0
+        self.difficulty = 1.0
+        self.fire_timer = 0
+        self.fired = 0  # volleys fired so far, by every game at once
+
+        self.frames = np.zeros(games, np.int64)
+        self.score = np.zeros(games, np.int64)
+        self.soldiers = np.full(games, REGIMENT_START_SOLDIERS, np.int64)
+        self.x = np.full(games, WIDTH // 2, np.int64)
+        self.rows = np.arange(games)
+
+        self.volleys = SlotArrays(games, VOLLEY_SLOTS, x=np.int64, hi=np.int64, lo=np.int64, r=np.int64,
+                                  n=np.int64, k=np.int64)
+        self.enemies = SlotArrays(games, 16, x=float, y=float, speed=float, hp=np.int64)
+        self.blocks = SlotArrays(games, 16, x=float, y=float, speed=float, value=np.int64)
+
+    def spawn_enemies(self):
+        xs, speeds, hps = [], [], []
+        for game in self.rows.tolist():
+            rng = self.rngs[game]
+            xs.append(rng.randint(60, WIDTH - 60))
+            speeds.append(ENEMY_SPEED_BASE * (0.8 + rng.random() * 0.6) * self.difficulty)
+            hps.append(rng.randint(1, 50))
+        self.enemies.spawn(self.frame, x=xs, y=-30, speed=speeds, hp=hps)
+
+    def spawn_blocks(self):
+        xs, speeds, values = [], [], []
+        for game in self.rows.tolist():
+            rng = self.rngs[game]
+            xs.append(rng.randint(80, WIDTH - 80))
+            speeds.append(BLOCK_SPEED_BASE * (0.8 + rng.random() * 0.6) * (0.9 + 0.3 * self.difficulty))
+            values.append(rng.randint(BLOCK_NEGATIVE_MIN, BLOCK_NEGATIVE_MAX))
+        self.blocks.spawn(self.frame, x=xs, y=-40, speed=speeds, value=values)
+
+    def fire(self, soldiers):
+        v = self.volleys
+        slot = self.fired % VOLLEY_SLOTS
+        base, rem = np.divmod(soldiers, MAX_BULLETS_PER_SECOND)
+        v.x[:, slot] = self.x[self.rows]
+        v.hi[:, slot] = base + 1
+        v.lo[:, slot] = base
+        v.r[:, slot] = rem
+        v.n[:, slot] = np.where(base > 0, MAX_BULLETS_PER_SECOND, rem)
+        v.k[:, slot] = 0
+        self.fired += 1
+
+    def volley_hits(self, targets, live, size, kind):
+        # (row, volley number, kind, slot, id) of every volley box overlapping a live target. A
+        # target only meets the one or two volleys at its height, found from the spacing, not by search
+        rows, cols, tx, ty = live
+        top = BULLET_START_Y - BULLET_RADIUS - BULLET_SPEED * self.frame  # volley i is at top + i * spacing
+        d = 2 * BULLET_RADIUS
+        first = -((top + d - 1 - ty) // VOLLEY_SPACING)
+        last = (ty + size - 1 - top) // VOLLEY_SPACING
+        lowest = max(0, self.fired - VOLLEY_SLOTS, -((top + 20 + BULLET_RADIUS) // VOLLEY_SPACING))  # culled above
+        v = self.volleys
+        hits = []
+        for step in range((size + d - 2) // VOLLEY_SPACING + 1):
+            number = first + step
+            near = (number <= last) & (number >= lowest) & (number < self.fired)
+            g, c, x0 = rows[near], cols[near], tx[near]
+            number = number[near].astype(np.int64)
+            slot = number % VOLLEY_SLOTS
+            bx = v.x[g, slot] - BULLET_RADIUS
+            hit = (bx < x0 + size) & (x0 < bx + d) & (v.k[g, slot] < v.n[g, slot])
+            g, c, number = g[hit], c[hit], number[hit]
+            hits.append((g, number, np.full(len(g), kind), c, targets.id[g, c]))
+        return hits
+
+    def shoot(self, enemy_live, block_live):
+        # The order World follows bullet by bullet: oldest volley first, in it the first enemy it
+        # overlaps (by spawn order) until that dies or the volley is spent, then the next one, then
+        # the first block, which takes every bullet left. Each game has its own list of hits; round
+        # j plays the j-th hit of every game at once
+        hits = (self.volley_hits(self.enemies, enemy_live, ENEMY_SIZE, 0)
+                + self.volley_hits(self.blocks, block_live, BLOCK_SIZE, 1))
+        rows, number, kind, cols, ident = (np.concatenate(column) for column in zip(*hits))
+        if not len(rows):
+            return 0
+        order = np.lexsort((ident, kind, number, rows))
+        rows, number, kind, cols = rows[order], number[order], kind[order], cols[order]
+        rank = rank_in_group(rows)
+
+        v, enemies, blocks = self.volleys, self.enemies, self.blocks
+        kills = np.zeros(len(self.rows), np.int64)
+        for j in range(rank.max() + 1):
+            pick = rank == j
+            g, slot, c, on_enemy = rows[pick], number[pick] % VOLLEY_SLOTS, cols[pick], kind[pick] == 0
+            hi, lo, r, n, k = v.hi[g, slot], v.lo[g, slot], v.r[g, slot], v.n[g, slot], v.k[g, slot]
+            used = damage_before(hi, lo, r, k)
+            left = k < n
+
+            # An enemy takes bullets until its hp is used up: the first count m whose damage reaches it
+            e = left & on_enemy & enemies.alive[g, c]
+            hp = enemies.hp[g, c]
+            need = used + hp
+            m = np.where(need <= hi * r, -(-need // hi), r + -(-(need - hi * r) // np.maximum(lo, 1)))
+            m = np.where((lo == 0) & (need > hi * r), n + 1, m)
+            killed = e & (m <= n)
+            spent = np.where(killed, m, n)
+            enemies.hp[g[e], c[e]] = (hp - (damage_before(hi, lo, r, spent) - used))[e]
+            enemies.alive[g[killed], c[killed]] = False
+            np.add.at(kills, g[killed], 1)
+            v.k[g[e], slot[e]] = spent[e]
+
+            # A block takes the rest of the volley, capped
+            b = left & ~on_enemy
+            gb, cb = g[b], c[b]
+            rest = (damage_before(hi, lo, r, n) - used)[b]
+            blocks.value[gb, cb] = np.minimum(blocks.value[gb, cb] + rest, BLOCK_POSITIVE_CAP)
+            v.k[gb, slot[b]] = n[b]
+        return kills
+
+    def step(self, commands):
+        # One tick of every running game; commands holds LEFT/STAY/RIGHT for every game
+        rows = self.rows
+        self.frame += 1
+        self.difficulty += DIFFICULTY_RAMP
+        x = np.clip(self.x[rows] + np.asarray(commands)[rows] * REGIMENT_SPEED,
+                    REGIMENT_RADIUS + 6, WIDTH - REGIMENT_RADIUS - 6)
+        self.x[rows] = x
+        soldiers = self.soldiers[rows]
+        self.fire_timer = max(0, self.fire_timer - 1)
+        if self.fire_timer == 0:
+            self.fire_timer = FIRE_PERIOD
+            self.fire(soldiers)
+
+        if self.frame % max(8, int(ENEMY_SPAWN_EVERY_FRAMES / self.difficulty)) == 0:
+            self.spawn_enemies()
+        if self.frame % max(12, int(BLOCK_SPAWN_EVERY_FRAMES / (0.7 + 0.3 * self.difficulty))) == 0:
+            self.spawn_blocks()
+
+        # Volleys have no position to move: their height follows from the frame
+        enemies, blocks = self.enemies, self.blocks
+        enemies.y += enemies.speed
+        blocks.y += blocks.speed
+        enemy_live = enemies.live(ENEMY_SIZE, HEIGHT + 40)
+        block_live = blocks.live(BLOCK_SIZE, HEIGHT + 60)
+
+        score = self.score[rows] + 10 * self.shoot(enemy_live, block_live)
+
+        # The regiment: enemies cost their hp (every hp > 0, so one clamp at the end is the same),
+        # blocks add or remove soldiers one at a time in spawn order
+        ry, rs = REGIMENT_Y - REGIMENT_RADIUS, 2 * REGIMENT_RADIUS
+        g, c, ex, ey = enemy_live
+        rx = x[g] - REGIMENT_RADIUS
+        gone = enemies.alive[g, c] & (((rx < ex + ENEMY_SIZE) & (ex < rx + rs) & (ry < ey + ENEMY_SIZE) & (ey < ry + rs))
+                                      | (enemies.y[g, c] > REGIMENT_Y))
+        g, c = g[gone], c[gone]
+        enemies.alive[g, c] = False
+        soldiers = np.maximum(0, soldiers - np.bincount(g, enemies.hp[g, c], len(rows)).astype(np.int64))
+
+        g, c, bx, by = block_live
+        rx = x[g] - REGIMENT_RADIUS
+        gone = ((rx < bx + BLOCK_SIZE) & (bx < rx + rs) & (ry < by + BLOCK_SIZE) & (by < ry + rs)) | (blocks.y[g, c] > REGIMENT_Y)
+        if gone.any():
+            g, c = g[gone], c[gone]
+            blocks.alive[g, c] = False
+            order = np.lexsort((blocks.id[g, c], g))
+            g, values = g[order], blocks.value[g, c][order]
+            rank = rank_in_group(g)
+            for j in range(rank.max() + 1):
+                pick = rank == j
+                gj, value = g[pick], values[pick]
+                s = soldiers[gj]
+                soldiers[gj] = np.where(value < 0, np.maximum(0, s + value),
+                                        np.where(value > 0, np.minimum(REGIMENT_MAX_SOLDIERS, s + value), s))
+
+        self.soldiers[rows] = soldiers
+        self.score[rows] = score + 1
+        self.frames[rows] = self.frame
+        lost = soldiers <= 0
+        if lost.any():
+            keep = ~lost
+            self.rows = rows[keep]
+            for arrays in (self.volleys, self.enemies, self.blocks):
+                arrays.take(keep)
+
+    def run(self, commands):
+        # commands[g] is the command stream of game g (a (games, ticks) array); stops once every
+        # game is lost or the streams end
+        commands = np.asarray(commands)
+        for tick in range(commands.shape[1]):
+            if not len(self.rows):
+                break
+            self.step(commands[:, tick])
+        return self
@@ -0,0 +1,319 @@
+# Field Runners simulation.
+# No pygame import here: the world only moves numbers, driven by one input command per tick, so games
+# can be simulated headless (balancing, replays, regression checks). field_runners.py draws it.
+import random
+from dataclasses import dataclass
+
+WIDTH, HEIGHT = 900, 600
+FPS = 60
+
+REGIMENT_SPEED = 8
+REGIMENT_RADIUS = 20
+REGIMENT_Y = HEIGHT - 60
+REGIMENT_START_SOLDIERS = 20
+REGIMENT_MIN_SOLDIERS = 0
+REGIMENT_MAX_SOLDIERS = 999
+
+BULLET_SPEED = 10
+BULLET_RADIUS = 4
+MAX_BULLETS_PER_SECOND = 20
+
+ENEMY_SPEED_BASE = 2.0
+ENEMY_SIZE = 32
+ENEMY_SPAWN_EVERY_FRAMES = 60
+
+BLOCK_SPEED_BASE = 1.8
+BLOCK_SIZE = 48
+BLOCK_SPAWN_EVERY_FRAMES = 90
+BLOCK_NEGATIVE_MIN = -6
+BLOCK_NEGATIVE_MAX = -2
+BLOCK_POSITIVE_CAP = 50
+
+DIFFICULTY_RAMP = 0.0005
+
+# Collision grid: a target spans at most 2x2 cells, a bullet box most often one
+CELL_SIZE = max(ENEMY_SIZE, BLOCK_SIZE)
+
+# Input commands, one per tick: where the regiment moves
+LEFT, STAY, RIGHT = -1, 0, 1
+
+
+def collide(a, b):
+    # Overlap of two (x, y, w, h) boxes, same rule as pygame.Rect.colliderect (touching edges do not count)
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+class SpatialHash:
+    # Uniform grid over a list of items with a box(), rebuilt every tick. A query only looks at the
+    # cells the box covers, and answers with the first overlapping item in list order, as a scan would
+    def __init__(self, items, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        for index, item in enumerate(items):
+            box = item.box()
+            entry = (index, box, item)
+            for key in self.keys(box):
+                cell = self.cells.get(key)
+                if cell is None:
+                    self.cells[key] = [entry]
+                else:
+                    cell.append(entry)
+
+    def keys(self, box):
+        # Cells under the box pixels; touching edges do not collide, so the last pixel is x + w - 1
+        size = self.cell_size
+        x0, y0 = box[0] // size, box[1] // size
+        x1, y1 = (box[0] + box[2] - 1) // size, (box[1] + box[3] - 1) // size
+        if x0 == x1 and y0 == y1:
+            return ((x0, y0),)
+        return [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
+
+    def first(self, box):
+        cells = self.cells
+        if not cells:
+            return None
+        size = self.cell_size
+        x0, y0 = box[0] // size, box[1] // size
+        x1, y1 = (box[0] + box[2] - 1) // size, (box[1] + box[3] - 1) // size
+        if x0 == x1 and y0 == y1:
+            # Most bullets sit inside one cell, often an empty one
+            cell = cells.get((x0, y0))
+            if cell is None:
+                return None
+            candidates = cell
+        else:
+            candidates = [entry for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)
+                          for entry in cells.get((x, y), ())]
+        found = None
+        for entry in candidates:
+            if (found is None or entry[0] < found[0]) and collide(box, entry[1]):
+                found = entry
+        return found and found[2]
+
+    def remove(self, item):
+        for key in self.keys(item.box()):
+            cell = self.cells[key]
+            for i, entry in enumerate(cell):
+                if entry[2] is item:
+                    # Cell order does not matter, the index in the entry keeps the list order
+                    cell[i] = cell[-1]
+                    cell.pop()
+                    break
+
+@dataclass
+class Bullet:
+    x: float
+    y: float
+    vy: float
+    damage: int
+
+    def update(self):
+        self.y -= self.vy
+
+    def box(self):
+        return (int(self.x - BULLET_RADIUS), int(self.y - BULLET_RADIUS), BULLET_RADIUS * 2, BULLET_RADIUS * 2)
+
+@dataclass
+class Enemy:
+    x: float
+    y: float
+    speed: float
+    hp: int
+
+    def update(self):
+        self.y += self.speed
+
+    def box(self):
+        return (int(self.x - ENEMY_SIZE / 2), int(self.y - ENEMY_SIZE / 2), ENEMY_SIZE, ENEMY_SIZE)
+
+@dataclass
+class Block:
+    x: float
+    y: float
+    value: int
+    speed: float
+
+    def update(self):
+        self.y += self.speed
+
+    def on_hit(self, damage):
+        self.value = min(self.value + damage, BLOCK_POSITIVE_CAP)
+
+    def box(self):
+        return (int(self.x - BLOCK_SIZE / 2), int(self.y - BLOCK_SIZE / 2), BLOCK_SIZE, BLOCK_SIZE)
+
+class Regiment:
+    def __init__(self):
+        self.x = WIDTH // 2
+        self.y = REGIMENT_Y
+        self.soldiers = REGIMENT_START_SOLDIERS
+        self.fire_timer = 0
+
+    def update(self, move_x):
+        self.x = max(REGIMENT_RADIUS + 6, min(WIDTH - REGIMENT_RADIUS - 6, self.x + move_x))
+        self.fire_timer = max(0, self.fire_timer - 1)
+
+    def get_bullet_damages(self):
+        if self.soldiers <= 0:
+            return []
+        soldiers = self.soldiers
+        base = soldiers // MAX_BULLETS_PER_SECOND
+        remainder = soldiers % MAX_BULLETS_PER_SECOND
+        damages = [base] * MAX_BULLETS_PER_SECOND
+        for i in range(remainder):
+            damages[i] += 1
+        return [d for d in damages if d > 0]
+
+    def try_fire(self):
+        if self.fire_timer > 0:
+            return []
+        self.fire_timer = FPS // MAX_BULLETS_PER_SECOND
+        return [Bullet(self.x, self.y - REGIMENT_RADIUS - 8, BULLET_SPEED, dmg) for dmg in self.get_bullet_damages()]
+
+    def box(self):
+        return (self.x - REGIMENT_RADIUS, self.y - REGIMENT_RADIUS, REGIMENT_RADIUS * 2, REGIMENT_RADIUS * 2)
+
+
+class World:
+    # One game. Spawns come from the world's own random generator, so a seed plus the list of
+    # commands replays a game exactly
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.regiment = Regiment()
+        self.bullets = []
+        self.enemies = []
+        self.blocks = []
+
+        self.frame = 0
+        self.score = 0
+        self.best = 0
+        self.difficulty = 1.0
+
+    @property
+    def over(self):
+        return self.regiment.soldiers <= 0
+
+    def spawn_enemy(self):
+        rng = self.rng
+        x = rng.randint(60, WIDTH - 60)
+        speed = ENEMY_SPEED_BASE * (0.8 + rng.random() * 0.6) * self.difficulty
+        hp = rng.randint(1, 50)
+        self.add_enemy(Enemy(x, -30, speed, hp))
+
+    def spawn_block(self):
+        rng = self.rng
+        x = rng.randint(80, WIDTH - 80)
+        speed = BLOCK_SPEED_BASE * (0.8 + rng.random() * 0.6) * (0.9 + 0.3 * self.difficulty)
+        val = rng.randint(BLOCK_NEGATIVE_MIN, BLOCK_NEGATIVE_MAX)
+        self.add_block(Block(x, -40, val, speed))
+
+    # Entity storage: lists of objects here, overridden by the NumPy backend (field_runners_arrays)
+    def add_bullets(self, bullets):
+        self.bullets.extend(bullets)
+
+    def add_enemy(self, enemy):
+        self.enemies.append(enemy)
+
+    def add_block(self, block):
+        self.blocks.append(block)
+
+    def move(self):
+        # Everything falls (bullets rise) one tick, then what left the screen is dropped
+        for b in self.bullets:
+            b.update()
+        self.bullets = [b for b in self.bullets if b.y >= -20]
+        for e in self.enemies:
+            e.update()
+        self.enemies = [e for e in self.enemies if e.y <= HEIGHT + 40]
+        for bl in self.blocks:
+            bl.update()
+        self.blocks = [bl for bl in self.blocks if bl.y <= HEIGHT + 60]
+
+    def handle_collisions(self):
+        # Each bullet hits the first enemy it overlaps, else the first block: with the blocks indexed
+        # after the enemies, that is the first target in the grid. Dead enemies leave the grid at once
+        # and the lists are compacted in one pass at the end, keeping their order
+        targets = SpatialHash(self.enemies + self.blocks)
+        bullets = []
+        killed = False
+        # The bullets of a volley share one position, so one grid query answers for all of them
+        # while they miss; a kill only ever clears boxes, so the answer holds for the whole pass
+        clear_x = clear_y = None
+        for b in self.bullets:
+            if b.y == clear_y and b.x == clear_x:
+                bullets.append(b)
+                continue
+            target = targets.first(b.box())
+            if target is None:
+                clear_x, clear_y = b.x, b.y
+                bullets.append(b)
+            elif isinstance(target, Enemy):
+                target.hp -= b.damage
+                if target.hp <= 0:
+                    targets.remove(target)
+                    self.score += 10
+                    killed = True
+            else:
+                target.on_hit(b.damage)
+        self.bullets = bullets
+        if killed:
+            self.enemies = [e for e in self.enemies if e.hp > 0]
+
+        rr = self.regiment.box()
+        enemies = []
+        for e in self.enemies:
+            if collide(rr, e.box()) or e.y > self.regiment.y:
+                self.regiment.soldiers -= e.hp
+                if self.regiment.soldiers < 0:
+                    self.regiment.soldiers = 0
+            else:
+                enemies.append(e)
+        self.enemies = enemies
+
+        blocks = []
+        for bl in self.blocks:
+            if collide(rr, bl.box()) or bl.y > self.regiment.y:
+                if bl.value < 0:
+                    self.regiment.soldiers = max(0, self.regiment.soldiers + bl.value)
+                elif bl.value > 0:
+                    self.regiment.soldiers = min(REGIMENT_MAX_SOLDIERS, self.regiment.soldiers + bl.value)
+            else:
+                blocks.append(bl)
+        self.blocks = blocks
+
+    def step(self, command=STAY):
+        # One tick (1/FPS s) with the regiment moving LEFT, STAY or RIGHT
+        self.frame += 1
+        self.difficulty += DIFFICULTY_RAMP
+
+        self.regiment.update(command * REGIMENT_SPEED)
+        self.add_bullets(self.regiment.try_fire())
+
+        if self.frame % max(8, int(ENEMY_SPAWN_EVERY_FRAMES / self.difficulty)) == 0:
+            self.spawn_enemy()
+        if self.frame % max(12, int(BLOCK_SPAWN_EVERY_FRAMES / (0.7 + 0.3 * self.difficulty))) == 0:
+            self.spawn_block()
+
+        self.move()
+        self.handle_collisions()
+        self.score += 1
+        self.best = max(self.best, self.score)
+
+    def run(self, commands):
+        # Play a command stream (any iterable of LEFT/STAY/RIGHT) until it ends or the game is lost
+        for command in commands:
+            if self.over:
+                break
+            self.step(command)
+        return self
+
+
+def replay(seed, commands):
+    # The world at the end of a recorded game
+    return World(seed).run(commands)
+
+def encode_commands(commands):
+    # One byte per tick, for storing replays
+    return bytes(c + 1 for c in commands)
+
+def decode_commands(data):
+    return [b - 1 for b in data]
@@ -1,6 +1,14 @@
+import argparse
+import collections
+import heapq
+import multiprocessing
+import os
 import pygame
 import random
+import signal
+import struct
 import sys
+import threading
 import time
 
 SUITS = ['♠', '♥', '♦', '♣']
@@ -29,6 +37,9 @@ UNDO_BTN_MARGIN = 10
 
 BASE_SCREEN_WIDTH = MARGIN*2 + 8*(CARD_WIDTH+TABLEAU_GAP)-TABLEAU_GAP
 BASE_SCREEN_HEIGHT = 700
+ANIM_DURATION = 0.5  # seconds a card takes to fly to its new place
+AUTO_STAGGER = 0.1  # delay between the cards of an automatic foundation run
+FAST_FORWARD = 4  # animation speed while Shift is held
 
 pygame.init()
 FONT = pygame.font.SysFont('arial', 24)
@@ -39,6 +50,7 @@ class Card:
         self.suit = suit
         self.rank = rank
         self.value = RANKS.index(rank)
+        self.id = SUITS.index(suit) * 13 + self.value
     def __str__(self):
         return f'{self.rank}{self.suit}'
     def __repr__(self):
@@ -50,17 +62,529 @@ def create_deck():
 def shuffle_deck(deck):
     random.shuffle(deck)
 
+# --- Compact state ---
+# A card is an int 0-51: suit index * 13 + rank index (so SUITS[c // 13], RANKS[c % 13]).
+# Slots are numbered tableau 0-7, freecells 8-12, foundations 13-16 (one per suit),
+# and a move is (src, dst, count). Moves are reversible, so undo only keeps the moves.
+NUM_COLUMNS = 8
+NUM_FREECELLS = 5
+FREECELL_SLOT = NUM_COLUMNS
+FOUNDATION_SLOT = NUM_COLUMNS + NUM_FREECELLS
+
+def card_str(c):
+    return f'{RANKS[c % 13]}{SUITS[c // 13]}'
+
+def is_red(c):
+    return c // 13 in (1, 2)
+
+# Lookup tables indexed by card id, so legality checks are plain indexing
+CARD_RANK = bytes(c % 13 for c in range(52))
+CARD_SUIT = bytes(c // 13 for c in range(52))
+CARD_RED = bytes(is_red(c) for c in range(52))
+# STACKS[card * 52 + onto] is 1 when card may be put on onto in the tableau
+STACKS = bytes(CARD_RED[a] != CARD_RED[b] and CARD_RANK[a] + 1 == CARD_RANK[b] for a in range(52) for b in range(52))
+
+class FreecellState:
+    def __init__(self, tableau=None, freecells=None, foundations=None):
+        self.tableau = tableau if tableau is not None else [[] for _ in range(NUM_COLUMNS)]
+        self.freecells = freecells if freecells is not None else [None] * NUM_FREECELLS
+        self.foundations = foundations if foundations is not None else [0, 0, 0, 0]  # cards on each suit's pile
+
+    def copy(self):
+        return FreecellState([col[:] for col in self.tableau], self.freecells[:], self.foundations[:])
+
+    def top(self, slot):
+        # Card on top of a slot, None when empty
+        if slot < FREECELL_SLOT:
+            col = self.tableau[slot]
+            return col[-1] if col else None
+        if slot < FOUNDATION_SLOT:
+            return self.freecells[slot - FREECELL_SLOT]
+        suit = slot - FOUNDATION_SLOT
+        n = self.foundations[suit]
+        return suit * 13 + n - 1 if n else None
+
+    def can_stack(self, card, col):
+        # Empty column, or one rank lower and the other colour
+        col = self.tableau[col]
+        return not col or STACKS[card * 52 + col[-1]] == 1
+
+    def can_found(self, card):
+        return self.foundations[CARD_SUIT[card]] == CARD_RANK[card]
+
+    def apply(self, move):
+        # No legality check here, callers check first (undo replays moves backwards)
+        src, dst, count = move
+        if src < FREECELL_SLOT:
+            cards = self.tableau[src][-count:]
+            del self.tableau[src][-count:]
+        elif src < FOUNDATION_SLOT:
+            cards = [self.freecells[src - FREECELL_SLOT]]
+            self.freecells[src - FREECELL_SLOT] = None
+        else:
+            suit = src - FOUNDATION_SLOT
+            self.foundations[suit] -= 1
+            cards = [suit * 13 + self.foundations[suit]]
+        if dst < FREECELL_SLOT:
+            self.tableau[dst].extend(cards)
+        elif dst < FOUNDATION_SLOT:
+            self.freecells[dst - FREECELL_SLOT] = cards[0]
+        else:
+            self.foundations[dst - FOUNDATION_SLOT] += 1
+
+    def revert(self, move):
+        src, dst, count = move
+        self.apply((dst, src, count))
+
+    def is_won(self):
+        return all(n == 13 for n in self.foundations)
+
+    def key(self):
+        # Immutable snapshot, usable as a dict key
+        return (tuple(tuple(col) for col in self.tableau), tuple(self.freecells), tuple(self.foundations))
+
+MAX_DEAL = 1000000
+
+# Microsoft deals number the deck A♣ A♦ A♥ A♠ 2♣ ...; map that order onto our card ids
+MS_CARDS = [(3, 2, 1, 0)[i % 4] * 13 + i // 4 for i in range(52)]
+
+def ms_deal_order(number):
+    # Cards in dealing order for Microsoft Freecell deal #number (its LCG and swap-with-last draw)
+    seed = number
+    deck = MS_CARDS[:]
+    order = []
+    for left in range(52, 0, -1):
+        seed = (seed * 214013 + 2531011) & 0xFFFFFFFF
+        j = ((seed >> 16) & 0x7FFF) % left
+        order.append(deck[j])
+        deck[j] = deck[left - 1]
+    return order
+
+def deal(number, ms=False):
+    # The same number always gives the same deal. Only ints are created, so dealing is cheap
+    if ms:
+        cards = ms_deal_order(number)
+    else:
+        cards = list(range(52))
+        random.Random(number).shuffle(cards)
+    state = FreecellState()
+    for i, c in enumerate(cards):
+        state.tableau[i % 8].append(c)
+    return state
+
+# --- Move generation ---
+
+def run_length(col):
+    # Length of the ordered run (descending, alternating colours) on top of a column
+    i = len(col) - 1
+    while i > 0 and STACKS[col[i] * 52 + col[i - 1]]:
+        i -= 1
+    return len(col) - i if col else 0
+
+def max_move(free_cells, empty_cols):
+    # Cards that can move as one sequence: every free cell doubles by each empty column used as a buffer
+    return (free_cells + 1) << empty_cols
+
+def sequence_move(state, src, dst):
+    # The column to column move of the longest run that fits, or None. What can move at once only
+    # depends on the free cells and empty columns, so there is no need to try card by card
+    col, target = state.tableau[src], state.tableau[dst]
+    if src == dst or not col:
+        return None
+    free = state.freecells.count(None)
+    empty = state.tableau.count([])
+    run = run_length(col)
+    if not target:
+        # The target column is no buffer; moving a whole column into an empty one changes nothing
+        count = min(run, max_move(free, empty - 1), len(col) - 1)
+        return (src, dst, count) if count else None
+    count = CARD_RANK[target[-1]] - CARD_RANK[col[-1]]
+    if 1 <= count <= run and count <= max_move(free, empty) and STACKS[col[-count] * 52 + target[-1]]:
+        return (src, dst, count)
+    return None
+
+def foundation_moves(state):
+    moves = []
+    foundations = state.foundations
+    for src in range(FOUNDATION_SLOT):
+        card = state.top(src)
+        if card is not None and foundations[CARD_SUIT[card]] == CARD_RANK[card]:
+            moves.append((src, FOUNDATION_SLOT + CARD_SUIT[card], 1))
+    return moves
+
+def legal_moves(state):
+    # Every legal move, sequence moves (supermoves) included. Empty freecells are interchangeable and
+    # so are empty columns, so only the first of each is used as a destination
+    moves = foundation_moves(state)
+    tableau, freecells = state.tableau, state.freecells
+    free = freecells.count(None)
+    empty_cols = [i for i, col in enumerate(tableau) if not col]
+    first_empty = empty_cols[0] if empty_cols else None
+    to_full = max_move(free, len(empty_cols))
+    to_empty = max_move(free, len(empty_cols) - 1) if empty_cols else 0
+    for src, col in enumerate(tableau):
+        if not col:
+            continue
+        top = col[-1]
+        run = run_length(col)
+        for dst, target in enumerate(tableau):
+            if dst == src or not target:
+                continue
+            # The card going onto target is one rank below it, so the rank gap gives the count
+            onto = target[-1]
+            count = CARD_RANK[onto] - CARD_RANK[top]
+            if 1 <= count <= run and count <= to_full and STACKS[col[-count] * 52 + onto]:
+                moves.append((src, dst, count))
+        if first_empty is not None:
+            # Moving a whole column into an empty one changes nothing
+            for count in range(1, min(run, to_empty, len(col) - 1) + 1):
+                moves.append((src, first_empty, count))
+        if free:
+            moves.append((src, FREECELL_SLOT + freecells.index(None), 1))
+    for i, card in enumerate(freecells):
+        if card is None:
+            continue
+        for dst, target in enumerate(tableau):
+            if target and STACKS[card * 52 + target[-1]]:
+                moves.append((FREECELL_SLOT + i, dst, 1))
+        if first_empty is not None:
+            moves.append((FREECELL_SLOT + i, first_empty, 1))
+    return moves
+
+# --- Solver ---
+
+# Suits of the other colour, by suit (♠ ♥ ♦ ♣)
+OTHER_COLOUR = ((1, 2), (0, 3), (0, 3), (1, 2))
+
+def safe_to_found(state, card):
+    # A card can go up for good once both opposite colour piles have reached the rank below it,
+    # nothing still in play can need it as a place to stack on
+    v = CARD_RANK[card]
+    foundations = state.foundations
+    if foundations[CARD_SUIT[card]] != v:
+        return False
+    if v <= 1:
+        return True
+    a, b = OTHER_COLOUR[CARD_SUIT[card]]
+    return foundations[a] >= v and foundations[b] >= v
+
+def play_safe_moves(state):
+    # Play every safe card up in one pass, returns the moves played. The cards on top of the slots
+    # are indexed by card, so each step looks only at the card a pile needs next; a pile going
+    # up re-checks itself and the other colour's piles, a revealed card its own pile
+    tops = {}
+    for slot in range(FOUNDATION_SLOT):
+        card = state.top(slot)
+        if card is not None:
+            tops[card] = slot
+    played = []
+    suits = [0, 1, 2, 3]
+    while suits:
+        suit = suits.pop()
+        n = state.foundations[suit]
+        slot = tops.get(suit * 13 + n) if n < 13 else None
+        if slot is None or not safe_to_found(state, suit * 13 + n):
+            continue
+        del tops[suit * 13 + n]
+        move = (slot, FOUNDATION_SLOT + suit, 1)
+        state.apply(move)
+        played.append(move)
+        suits.append(suit)
+        suits.extend(OTHER_COLOUR[suit])
+        card = state.top(slot)
+        if card is not None:
+            tops[card] = slot
+            suits.append(CARD_SUIT[card])
+    return played
+
+def canonical_key(state):
+    # Freecells are interchangeable and so are columns: sort both before hashing
+    cells = bytes(sorted(52 if c is None else c for c in state.freecells))
+    return bytes(state.foundations) + cells + b'\xff'.join(sorted(bytes(col) for col in state.tableau))
+
+def heuristic(state):
+    # Cards still to go up, plus cards lying on a lower card (they have to move first), plus full freecells
+    h = 2 * (52 - sum(state.foundations))
+    for col in state.tableau:
+        lowest = 13
+        for c in col:
+            if c % 13 > lowest:
+                h += 1
+            else:
+                lowest = c % 13
+    return h + sum(c is not None for c in state.freecells)
+
+def solve(state, max_states=200000, stop=None):
+    # Best-first search. Returns (moves, nodes): moves is None when no solution was found before
+    # the closed set reached max_states (or stop() returned True)
+    state = state.copy()
+    path = None  # moves as a linked list (move, parent) so children share their prefix
+    for move in play_safe_moves(state):
+        path = (move, path)
+    closed = {canonical_key(state)}
+    heap = [(heuristic(state), 0, state, path)]
+    counter = 1
+    nodes = 0
+    while heap:
+        _, _, state, path = heapq.heappop(heap)
+        nodes += 1
+        if state.is_won():
+            moves = []
+            while path is not None:
+                move, path = path
+                moves.append(move)
+            return moves[::-1], nodes
+        if stop is not None and not nodes & 255 and stop():
+            break
+        for move in legal_moves(state):
+            child = state.copy()
+            child.apply(move)
+            child_path = (move, path)
+            # Safe cards go up straight away, it never hurts
+            for auto in play_safe_moves(child):
+                child_path = (auto, child_path)
+            key = canonical_key(child)
+            if key in closed:
+                continue
+            closed.add(key)
+            heapq.heappush(heap, (heuristic(child), counter, child, child_path))
+            counter += 1
+        if len(closed) > max_states:
+            break
+    return None, nodes
+
+class BackgroundSolver:
+    # Runs solve() on a worker thread so the render loop never waits on it
+    def __init__(self, max_states=200000):
+        self.max_states = max_states
+        self.thread = None
+        self.pending = False
+        self.key = None  # state the search started from
+        self.result = None
+
+    def start(self, state):
+        if self.pending:
+            return
+        self.pending = True
+        self.key = state.key()
+        self.result = None
+        self.thread = threading.Thread(target=self._run, args=(state.copy(),), daemon=True)
+        self.thread.start()
+
+    def _run(self, state):
+        me = threading.current_thread()
+        moves, _ = solve(state, self.max_states, stop=lambda: self.thread is not me)
+        if self.thread is me:
+            self.result = moves
+
+    def busy(self):
+        return self.pending
+
+    def poll(self):
+        # True once the search is done; the moves (None: no solution) are in self.result
+        if not self.pending or self.thread.is_alive():
+            return False
+        self.pending = False
+        self.thread = None
+        return True
+
+    def cancel(self):
+        self.pending = False
+        self.thread = None
+        self.result = None
+
+# --- Batch solvability analysis ---
+# python freecell.py --batch 1 1000000 --log deals.bin
+# The log is a header followed by one fixed-size record per deal, appended as results come in.
+# Running the same command again skips the seeds already in the log.
+
+LOG_MAGIC = b'FCL1'
+LOG_RECORD = struct.Struct('<IBHIf')  # seed, solved, solution length, nodes expanded, seconds
+
+def _init_worker():
+    # SDL (started by pygame.init at import) swallows SIGTERM, which Pool.terminate relies on
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _solve_deal(args):
+    seed, max_states, time_budget, ms = args
+    start = time.perf_counter()
+    deadline = start + time_budget if time_budget else None
+    moves, nodes = solve(deal(seed, ms), max_states, stop=lambda: deadline is not None and time.perf_counter() > deadline)
+    return seed, moves is not None, len(moves) if moves else 0, nodes, time.perf_counter() - start
+
+def read_log(path):
+    # Seeds already in the log; a record cut short by an interruption is dropped
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < len(LOG_MAGIC) and LOG_MAGIC.startswith(data):
+        # Empty, or the header cut short: nothing logged yet, batch_solve starts it again
+        if data:
+            with open(path, 'r+b') as f:
+                f.truncate(0)
+        return done
+    if data[:len(LOG_MAGIC)] != LOG_MAGIC:
+        raise ValueError(f'{path} is not a Freecell batch log')
+    body = len(data) - len(LOG_MAGIC)
+    whole = body - body % LOG_RECORD.size
+    for rec in LOG_RECORD.iter_unpack(data[len(LOG_MAGIC):len(LOG_MAGIC) + whole]):
+        done.add(rec[0])
+    if whole != body:
+        with open(path, 'r+b') as f:
+            f.truncate(len(LOG_MAGIC) + whole)
+    return done
+
+def batch_solve(first, last, path, max_states=50000, time_budget=10.0, processes=None, ms=False):
+    done = read_log(path)
+    seeds = [seed for seed in range(first, last + 1) if seed not in done]
+    print(f'{len(done)} deals already in {path}, {len(seeds)} to go')
+    if not seeds:
+        return
+    signal.signal(signal.SIGINT, signal.default_int_handler)  # let Ctrl+C stop the batch
+    start = last_report = time.perf_counter()
+    count = solved = 0
+    with open(path, 'ab') as log, multiprocessing.Pool(processes, _init_worker) as pool:
+        if log.tell() == 0:
+            log.write(LOG_MAGIC)
+        jobs = ((seed, max_states, time_budget, ms) for seed in seeds)
+        try:
+            for seed, ok, length, nodes, seconds in pool.imap_unordered(_solve_deal, jobs, chunksize=8):
+                log.write(LOG_RECORD.pack(seed, ok, length, nodes, seconds))
+                count += 1
+                solved += ok
+                now = time.perf_counter()
+                if now - last_report >= 2 or count == len(seeds):
+                    log.flush()
+                    last_report = now
+                    print(f'\r{count}/{len(seeds)} deals  {solved / count:.1%} solved  {count / (now - start):.1f} deals/s', end='', flush=True)
+        except KeyboardInterrupt:
+            print('\nInterrupted, run the same command again to resume', end='')
+    print()
+
+# --- Saved game ---
+# A game is its deal plus the moves played, kept as undo groups: replaying them on the int state
+# rebuilds the position and the undo history. Written after every move, removed once won.
+
+SAVE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'freecell_save.bin')
+SAVE_MAGIC = b'FCS1'
+SAVE_HEADER = struct.Struct('<IBfI')  # deal number, Microsoft numbering, seconds played, undo groups
+
+def save_session(game, path=SAVE_PATH):
+    # Header, the length of each undo group, then 3 bytes (src, dst, count) per move.
+    # Written to a temporary file and renamed, so a crash never leaves half a save
+    groups = [group for group in game.undo_stack if group]
+    data = [SAVE_MAGIC, SAVE_HEADER.pack(game.deal_number, game.ms, game.elapsed, len(groups)),
+            struct.pack(f'<{len(groups)}H', *map(len, groups))]
+    data += [bytes(move) for group in groups for move in group]
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(b''.join(data))
+    os.replace(tmp, path)
+
+def load_session(path=SAVE_PATH):
+    # (deal number, ms, seconds played, undo groups), or None without a readable save
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:4] != SAVE_MAGIC:
+            return None
+        number, ms, elapsed, count = SAVE_HEADER.unpack_from(data, 4)
+        pos = 4 + SAVE_HEADER.size
+        lengths = struct.unpack_from(f'<{count}H', data, pos)
+    except (OSError, struct.error):
+        return None
+    pos += 2 * count
+    if len(data) != pos + 3 * sum(lengths) or not 1 <= number <= MAX_DEAL:
+        return None
+    groups = []
+    for n in lengths:
+        groups.append([tuple(data[i:i + 3]) for i in range(pos, pos + 3 * n, 3)])
+        pos += 3 * n
+    return number, bool(ms), elapsed, groups
+
+def remove_session(path=SAVE_PATH):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+_card_sets = {}
+
+def card_set(card_class):
+    # One shared set of 52 card objects per class, indexed by card id and only built when
+    # something is displayed; games themselves just hold ints
+    cards = _card_sets.get(card_class)
+    if cards is None:
+        cards = _card_sets[card_class] = [card_class(s, r) for s in SUITS for r in RANKS]
+    return cards
+
 class FreecellGame:
-    def __init__(self):
-        self.deck = create_deck()
-        shuffle_deck(self.deck)
-        self.freecells = [None for _ in range(5)]
-        self.foundations = {suit: [] for suit in SUITS}
-        self.tableau = [[] for _ in range(8)]
+    card_class = Card
+    def __init__(self, deal_number=None, ms=False):
+        if deal_number is None:
+            deal_number = random.randint(1, MAX_DEAL)
+        self.deal_number = deal_number
+        self.ms = ms
+        self.undo_stack = []  # one list of moves per user action
+        self.elapsed = 0.0  # seconds played
         self.deal_cards()
+    @classmethod
+    def resume(cls, path=SAVE_PATH):
+        # The saved game, replayed move by move on the int state; None without a usable save
+        session = load_session(path)
+        if session is None:
+            return None
+        number, ms, elapsed, groups = session
+        game = cls(number, ms)
+        state = game.state
+        try:
+            for group in groups:
+                for move in group:
+                    state.apply(move)
+        except (IndexError, TypeError):
+            return None
+        # A damaged save could still replay; every card must be somewhere exactly once
+        cards = [c for col in state.tableau for c in col] + [c for c in state.freecells if c is not None]
+        if len(cards) + sum(state.foundations) != 52 or len(set(cards)) != len(cards):
+            return None
+        game.undo_stack = groups
+        game.elapsed = elapsed
+        return game
     def deal_cards(self):
-        for i, card in enumerate(self.deck):
-            self.tableau[i % 8].append(card)
+        self.state = deal(self.deal_number, self.ms)
+    @property
+    def cards(self):
+        return card_set(self.card_class)
+    # Card object views of the state, for display
+    @property
+    def tableau(self):
+        cards = self.cards
+        return [[cards[c] for c in col] for col in self.state.tableau]
+    @property
+    def freecells(self):
+        return [None if c is None else self.cards[c] for c in self.state.freecells]
+    @property
+    def foundations(self):
+        return {suit: self.cards[i * 13:i * 13 + n] for i, (suit, n) in enumerate(zip(SUITS, self.state.foundations))}
+    def begin_undo_group(self):
+        self.undo_stack.append([])
+    def do_move(self, move):
+        # Apply a move and record it in the current undo group
+        self.state.apply(move)
+        if not self.undo_stack:
+            self.begin_undo_group()
+        self.undo_stack[-1].append(move)
+    def undo(self):
+        while self.undo_stack and not self.undo_stack[-1]:
+            self.undo_stack.pop()
+        if not self.undo_stack:
+            return False
+        for move in reversed(self.undo_stack.pop()):
+            self.state.revert(move)
+        return True
     def display(self):
         print('\nFreecells:', [str(c) if c else '  ' for c in self.freecells])
         print('Foundations:', {s: (str(p[-1]) if p else '--') for s, p in self.foundations.items()})
@@ -72,77 +596,58 @@ class FreecellGame:
                 row.append(str(col[i]) if i < len(col) else '   ')
             print(' '.join(row))
     def move_tableau_to_freecell(self, t_col, f_idx):
-        if self.freecells[f_idx] is not None:
+        if self.state.freecells[f_idx] is not None:
             print('Freecell not empty!')
             return False
-        if not self.tableau[t_col]:
+        if not self.state.tableau[t_col]:
             print('Tableau column empty!')
             return False
-        self.freecells[f_idx] = self.tableau[t_col].pop()
+        self.do_move((t_col, FREECELL_SLOT + f_idx, 1))
         return True
     def move_freecell_to_tableau(self, f_idx, t_col):
-        card = self.freecells[f_idx]
+        card = self.state.freecells[f_idx]
         if card is None:
             print('Freecell empty!')
             return False
-        if not self.tableau[t_col]:
-            self.tableau[t_col].append(card)
-            self.freecells[f_idx] = None
-            return True
-        top = self.tableau[t_col][-1]
-        if top.suit in ['♠', '♣']:
-            valid = card.suit in ['♥', '♦']
-        else:
-            valid = card.suit in ['♠', '♣']
-        if valid and card.value == top.value - 1:
-            self.tableau[t_col].append(card)
-            self.freecells[f_idx] = None
+        if self.state.can_stack(card, t_col):
+            self.do_move((FREECELL_SLOT + f_idx, t_col, 1))
             return True
         print('Invalid move!')
         return False
     def move_tableau_to_tableau(self, from_col, to_col):
-        if not self.tableau[from_col]:
+        # Moves the whole run that fits, as one undo step
+        if not self.state.tableau[from_col]:
             print('Source tableau empty!')
             return False
-        card = self.tableau[from_col][-1]
-        if not self.tableau[to_col]:
-            self.tableau[to_col].append(self.tableau[from_col].pop())
-            return True
-        top = self.tableau[to_col][-1]
-        if top.suit in ['♠', '♣']:
-            valid = card.suit in ['♥', '♦']
-        else:
-            valid = card.suit in ['♠', '♣']
-        if valid and card.value == top.value - 1:
-            self.tableau[to_col].append(self.tableau[from_col].pop())
+        move = sequence_move(self.state, from_col, to_col)
+        if move is not None:
+            self.begin_undo_group()
+            self.do_move(move)
             return True
         print('Invalid move!')
         return False
     def move_tableau_to_foundation(self, t_col):
-        if not self.tableau[t_col]:
+        if not self.state.tableau[t_col]:
             print('Tableau column empty!')
             return False
-        card = self.tableau[t_col][-1]
-        foundation = self.foundations[card.suit]
-        if (not foundation and card.rank == 'A') or (foundation and RANKS.index(card.rank) == RANKS.index(foundation[-1].rank) + 1):
-            self.foundations[card.suit].append(self.tableau[t_col].pop())
+        card = self.state.tableau[t_col][-1]
+        if self.state.can_found(card):
+            self.do_move((t_col, FOUNDATION_SLOT + card // 13, 1))
             return True
         print('Invalid move to foundation!')
         return False
     def move_freecell_to_foundation(self, f_idx):
-        card = self.freecells[f_idx]
+        card = self.state.freecells[f_idx]
         if card is None:
             print('Freecell empty!')
             return False
-        foundation = self.foundations[card.suit]
-        if (not foundation and card.rank == 'A') or (foundation and RANKS.index(card.rank) == RANKS.index(foundation[-1].rank) + 1):
-            self.foundations[card.suit].append(card)
-            self.freecells[f_idx] = None
+        if self.state.can_found(card):
+            self.do_move((FREECELL_SLOT + f_idx, FOUNDATION_SLOT + card // 13, 1))
             return True
         print('Invalid move to foundation!')
         return False
     def is_won(self):
-        return all(len(pile) == 13 for pile in self.foundations.values())
+        return self.state.is_won()
     def play(self):
         print('Welcome to Freecell (5 free cells)!')
         while True:
@@ -156,6 +661,7 @@ class FreecellGame:
             print('  tt <from> <to>            (tableau to tableau)')
             print('  tfnd <tableau>            (tableau to foundation)')
             print('  ffnd <freecell>           (freecell to foundation)')
+            print('  u                        (undo)')
             print('  q                        (quit)')
             cmd = input('Enter command: ').strip().split()
             if not cmd:
@@ -163,6 +669,11 @@ class FreecellGame:
             if cmd[0] == 'q':
                 print('Goodbye!')
                 break
+            if cmd[0] == 'u':
+                if not self.undo():
+                    print('Nothing to undo!')
+                continue
+            self.begin_undo_group()
             try:
                 if cmd[0] == 'tf':
                     t, f = int(cmd[1]), int(cmd[2])
@@ -184,292 +695,635 @@ class FreecellGame:
             except (IndexError, ValueError):
                 print('Invalid input!')
 
-class PygameCard(Card):
-    font_cache = {}
-    def __init__(self, suit, rank):
-        super().__init__(suit, rank)
-        self.rect = pygame.Rect(0, 0, CARD_WIDTH, CARD_HEIGHT)
-        self.selected = False
+class Tween:
+    # Cards flying together from one (zone, idx) place to another, the first card at the place and
+    # the others fanned below it as in a column; positions are looked up when drawn, so a resize
+    # mid-flight lands the cards in the right place
+    def __init__(self, cards, src, dst, duration=ANIM_DURATION, delay=0.0):
+        self.cards = cards
+        self.src = src
+        self.dst = dst
+        self.duration = duration
+        self.elapsed = -delay
+
+    def progress(self):
+        return min(1.0, max(0.0, self.elapsed / self.duration))
+
+class TweenScheduler:
+    # Advances every active tween by the frame's elapsed time; the game loop calls update(dt)
+    def __init__(self):
+        self.tweens = []
+
+    def add(self, tween):
+        self.tweens.append(tween)
+
+    def update(self, dt):
+        for tween in self.tweens:
+            tween.elapsed += dt
+        self.tweens = [t for t in self.tweens if t.elapsed < t.duration]
+
+    def finish_all(self):
+        self.tweens = []
+
+    def busy(self):
+        return bool(self.tweens)
+
+    def flying(self):
+        # Cards that are drawn by their tween rather than in their slot
+        return {card for t in self.tweens for card in t.cards}
+
+class CardAtlas:
+    # Every face pre-rendered per scale: a 13 x 12 grid of rank by suit, for the normal,
+    # highlighted (hovered or selected) and small foundation variants.
+    # Drawing a card is then one blit of a subsurface; a few scales are kept for resizes.
+    NORMAL, HIGHLIGHT, SMALL = range(3)
+
+    def __init__(self, max_scales=4):
+        self.max_scales = max_scales
+        self.scales = collections.OrderedDict()  # scale -> list of faces, indexed variant*52 + card
+        self.font_cache = {}
 
     def get_font(self, size):
         if size not in self.font_cache:
             self.font_cache[size] = pygame.font.SysFont('arial', size)
         return self.font_cache[size]
 
-    def draw(self, surface, pos, selected=False, small=False, hovered=False, scale=1.0):
-        border_radius = int((12 if not small else 8) * scale)
-        if small:
-            rect = pygame.Rect(pos[0], pos[1], int(FOUNDATION_WIDTH*scale), int(FOUNDATION_HEIGHT*scale))
-        else:
-            self.rect.topleft = pos
-            rect = pygame.Rect(pos[0], pos[1], int(CARD_WIDTH*scale), int(CARD_HEIGHT*scale))
-        if hovered or selected:
-            color = (255, 255, 180)
+    def clear(self):
+        self.scales.clear()
+
+    def face(self, card, variant, scale):
+        faces = self.scales.get(scale)
+        if faces is None:
+            faces = self.build(scale)
+            self.scales[scale] = faces
+            if len(self.scales) > self.max_scales:
+                self.scales.popitem(last=False)
         else:
-            color = CARD_COLOR
+            self.scales.move_to_end(scale)
+        return faces[variant*52 + card]
+
+    def build(self, scale):
+        card_w, card_h = int(CARD_WIDTH*scale), int(CARD_HEIGHT*scale)
+        small_w, small_h = int(FOUNDATION_WIDTH*scale), int(FOUNDATION_HEIGHT*scale)
+        # Colour-keyed rather than per-pixel alpha (only the rounded corners are see-through): much faster to blit
+        atlas = pygame.Surface((13*card_w, 8*card_h + 4*small_h))
+        if pygame.display.get_surface():
+            atlas = atlas.convert()  # display pixel format
+        atlas.fill(ATLAS_KEY)
+        atlas.set_colorkey(ATLAS_KEY, pygame.RLEACCEL)
+        faces = []
+        for variant in (self.NORMAL, self.HIGHLIGHT, self.SMALL):
+            w, h = (small_w, small_h) if variant == self.SMALL else (card_w, card_h)
+            for card in range(52):
+                rect = pygame.Rect(CARD_RANK[card]*w, variant*4*card_h + CARD_SUIT[card]*h, w, h)
+                self.render(atlas, rect, card, variant, scale)
+                faces.append(atlas.subsurface(rect))
+        return faces
+
+    def render(self, surface, rect, card, variant, scale):
+        small = variant == self.SMALL
+        border_radius = int((12 if not small else 8) * scale)
+        color = (255, 255, 180) if variant == self.HIGHLIGHT else CARD_COLOR
         pygame.draw.rect(surface, color, rect, border_radius=border_radius)
         pygame.draw.rect(surface, CARD_BORDER, rect, 2, border_radius=border_radius)
         # Dynamically scale font
         font_size = int((18 if small else 24) * scale)
         font = self.get_font(font_size)
-        text_color = RED if self.suit in ['♥', '♦'] else BLACK
-        text = font.render(str(self), True, text_color)
+        text_color = RED if CARD_RED[card] else BLACK
+        text = font.render(card_str(card), True, text_color)
         text_pos = (rect.x + int(4*scale), rect.y + int(4*scale)) if small else (rect.x + int(10*scale), rect.y + int(10*scale))
         surface.blit(text, text_pos)
         # Mirrored text
-        text_rev = font.render(str(self), True, text_color)
         if small:
-            rev_x = rect.right - text_rev.get_width() - int(4*scale)
-            rev_y = rect.bottom - text_rev.get_height() - int(4*scale)
+            rev_x = rect.right - text.get_width() - int(4*scale)
+            rev_y = rect.bottom - text.get_height() - int(4*scale)
         else:
-            rev_x = rect.right - text_rev.get_width() - int(10*scale)
-            rev_y = rect.bottom - text_rev.get_height() - int(10*scale)
-        text_rev_img = pygame.transform.rotate(text_rev, 180)
-        surface.blit(text_rev_img, (rev_x, rev_y))
+            rev_x = rect.right - text.get_width() - int(10*scale)
+            rev_y = rect.bottom - text.get_height() - int(10*scale)
+        surface.blit(pygame.transform.rotate(text, 180), (rev_x, rev_y))
+
+ATLAS_KEY = (255, 0, 255)
+CARD_ATLAS = CardAtlas()
+
+class PygameCard(Card):
+    def __init__(self, suit, rank):
+        super().__init__(suit, rank)
+        self.rect = pygame.Rect(0, 0, CARD_WIDTH, CARD_HEIGHT)
+        self.selected = False
+
+    def draw(self, surface, pos, selected=False, small=False, hovered=False, scale=1.0):
+        if small:
+            variant = CardAtlas.SMALL
+        else:
+            self.rect.topleft = pos
+            variant = CardAtlas.HIGHLIGHT if hovered or selected else CardAtlas.NORMAL
+        surface.blit(CARD_ATLAS.face(self.id, variant, scale), pos)
+
+class Layout:
+    # Table geometry for one window size, computed once per resize. Every slot sits on a regular
+    # grid, so positions and hit-tests are plain arithmetic (O(1), no scanning of rects)
+    def __init__(self, width, height):
+        self.size = (width, height)
+        self.scale = scale = min(width / BASE_SCREEN_WIDTH, height / BASE_SCREEN_HEIGHT)
+        self.card_w, self.card_h = int(CARD_WIDTH*scale), int(CARD_HEIGHT*scale)
+        self.margin = int(MARGIN*scale)
+        self.freecell_pitch = self.card_w + int(FREECELL_GAP*scale)
+        self.tableau_pitch = self.card_w + int(TABLEAU_GAP*scale)
+        self.tableau_y = self.margin + self.card_h + int(60*scale)
+        self.row_gap = int(30*scale)
+        self.foundation_w, self.foundation_h = int(FOUNDATION_WIDTH*scale), int(FOUNDATION_HEIGHT*scale)
+        self.foundation_pitch = self.foundation_w + int(FOUNDATION_GAP*scale)
+        self.foundation_x = width - self.margin - (4*self.foundation_pitch - int(FOUNDATION_GAP*scale))
+        self.foundation_y = self.margin + int(10*scale)
+        self.button_size = button = int(UNDO_BTN_SIZE*scale)
+        self.button_margin = gap = int(UNDO_BTN_MARGIN*scale)
+        self.undo_rect = pygame.Rect(width - button*2 - gap*2, height - button - gap, button, button)
+        self.restart_rect = pygame.Rect(width - button - gap, height - button - gap, button, button)
+
+    def freecell_rect(self, i):
+        return pygame.Rect(self.margin + i*self.freecell_pitch, self.margin, self.card_w, self.card_h)
+
+    def foundation_rect(self, i):
+        return pygame.Rect(self.foundation_x + i*self.foundation_pitch, self.foundation_y, self.foundation_w, self.foundation_h)
+
+    def card_rect(self, col, row):
+        return pygame.Rect(self.margin + col*self.tableau_pitch, self.tableau_y + row*self.row_gap, self.card_w, self.card_h)
+
+    def column_rect(self, col, length):
+        # The whole column, or its empty place
+        return pygame.Rect(self.margin + col*self.tableau_pitch, self.tableau_y, self.card_w, self.card_h + self.row_gap*max(0, length - 1))
+
+    def card_pos(self, zone, idx):
+        # (x, y) of a card in a zone, idx as in slot_zone
+        if zone == 'freecell':
+            return self.freecell_rect(idx).topleft
+        elif zone == 'foundation':
+            return self.foundation_rect(idx).topleft
+        elif zone == 'tableau':
+            return self.card_rect(*idx).topleft
+        return (0, 0)
+
+    def slot_rect(self, slot, length):
+        # Top card of a slot (or the empty slot); length is the column's number of cards
+        if slot < FREECELL_SLOT:
+            return self.card_rect(slot, max(0, length - 1))
+        if slot < FOUNDATION_SLOT:
+            return self.freecell_rect(slot - FREECELL_SLOT)
+        return self.foundation_rect(slot - FOUNDATION_SLOT)
+
+    def freecell_at(self, pos):
+        i, dx = divmod(pos[0] - self.margin, self.freecell_pitch)
+        if 0 <= i < NUM_FREECELLS and dx < self.card_w and 0 <= pos[1] - self.margin < self.card_h:
+            return i
+        return None
+
+    def foundation_at(self, pos):
+        i, dx = divmod(pos[0] - self.foundation_x, self.foundation_pitch)
+        if 0 <= i < 4 and dx < self.foundation_w and 0 <= pos[1] - self.foundation_y < self.foundation_h:
+            return i
+        return None
+
+    def column_at(self, pos):
+        # Column whose x range holds pos, if pos is at tableau height
+        col, dx = divmod(pos[0] - self.margin, self.tableau_pitch)
+        if 0 <= col < NUM_COLUMNS and dx < self.card_w and pos[1] >= self.tableau_y:
+            return col
+        return None
+
+    def row_at(self, pos, length):
+        # Index of the visible card of a column of `length` cards under pos (the lower cards
+        # overlap the ones above them), or None
+        dy = pos[1] - self.tableau_y
+        if length == 0 or not 0 <= dy < self.row_gap*(length - 1) + self.card_h:
+            return None
+        return min(length - 1, dy // self.row_gap) if self.row_gap else length - 1
 
 class PygameFreecellGame(FreecellGame):
-    def __init__(self):
-        self.deck = [PygameCard(s, r) for s in SUITS for r in RANKS]
-        shuffle_deck(self.deck)
-        self.freecells = [None for _ in range(5)]
-        self.foundations = {suit: [] for suit in SUITS}
-        self.tableau = [[] for _ in range(8)]
-        self.deal_cards()
+    card_class = PygameCard
+    def __init__(self, deal_number=None, ms=False, save_path=SAVE_PATH):
+        super().__init__(deal_number, ms)
+        self.save_path = save_path  # None: nothing is written
+        self.unsaved = True  # a new deal replaces the saved game at once
+        self.deal_entry = None  # digits typed after pressing D
         self.selected = None  # (zone, idx, card)
         self.running = True
         self.win = False
-        self.move_history = []  # For undo
-        # Place undo and restart buttons at bottom right
-        screen_width = MARGIN*2 + 8*(CARD_WIDTH+TABLEAU_GAP)-TABLEAU_GAP
-        screen_height = 700
-        self.undo_btn_rect = pygame.Rect(
-            screen_width - UNDO_BTN_SIZE*2 - UNDO_BTN_MARGIN*2,
-            screen_height - UNDO_BTN_SIZE - UNDO_BTN_MARGIN,
-            UNDO_BTN_SIZE,
-            UNDO_BTN_SIZE
-        )
-        self.restart_btn_rect = pygame.Rect(
-            screen_width - UNDO_BTN_SIZE - UNDO_BTN_MARGIN,
-            screen_height - UNDO_BTN_SIZE - UNDO_BTN_MARGIN,
-            UNDO_BTN_SIZE,
-            UNDO_BTN_SIZE
-        )
-        self.animations = []  # List of (card, start_pos, end_pos, on_complete)
-        self.animating = False
-        self.animating_card_info = None  # (zone, idx) of card being animated
-        self.base_card_width = CARD_WIDTH
-        self.base_card_height = CARD_HEIGHT
-        self.base_margin = MARGIN
-        self.base_tableau_gap = TABLEAU_GAP
-        self.base_freecell_gap = FREECELL_GAP
-        self.base_foundation_gap = FOUNDATION_GAP
-        self.base_foundation_width = FOUNDATION_WIDTH
-        self.base_foundation_height = FOUNDATION_HEIGHT
-        self.base_undo_btn_size = UNDO_BTN_SIZE
-        self.base_undo_btn_margin = UNDO_BTN_MARGIN
-        self.base_screen_width = BASE_SCREEN_WIDTH
-        self.base_screen_height = BASE_SCREEN_HEIGHT
-    def draw(self, screen, anim_card=None):
-        mouse_pos = pygame.mouse.get_pos()
-        scale = self.get_scale(screen)
-        # Dynamically scale all constants
-        CARD_W = int(self.base_card_width * scale)
-        CARD_H = int(self.base_card_height * scale)
-        MARG = int(self.base_margin * scale)
-        TABLEAU_G = int(self.base_tableau_gap * scale)
-        FREECELL_G = int(self.base_freecell_gap * scale)
-        FOUNDATION_G = int(self.base_foundation_gap * scale)
-        FOUNDATION_W = int(self.base_foundation_width * scale)
-        FOUNDATION_H = int(self.base_foundation_height * scale)
-        UNDO_SIZE = int(self.base_undo_btn_size * scale)
-        UNDO_MARGIN = int(self.base_undo_btn_margin * scale)
-        screen_width = screen.get_width()
+        self.solver = BackgroundSolver()
+        self.plan = None  # (state key, moves) of the last solution found
+        self.solver_mode = None  # 'hint' or 'solve' while the solver runs
+        self.hint = None  # move shown by the hint
+        self.autosolving = False
+        self.status = ''
+        self.layout = Layout(BASE_SCREEN_WIDTH, BASE_SCREEN_HEIGHT)
+        self.tweens = TweenScheduler()
+        # What draw left on screen: zone key -> (rect, signature)
+        self._drawn = {}
+        self._drawn_screen = None
+        self._drawn_size = None
+        self._flying_rects = []
+        self._overlay_rects = []
+        self.show_redraw = False  # F3: frame the regions repainted each frame
+    @property
+    def undo_btn_rect(self):
+        return self.layout.undo_rect
+
+    @property
+    def restart_btn_rect(self):
+        return self.layout.restart_rect
+
+    def get_layout(self, screen):
+        if self.layout.size != screen.get_size():
+            self.layout = Layout(*screen.get_size())
+        return self.layout
+
+    @property
+    def animating(self):
+        return self.tweens.busy()
+
+    def invalidate(self):
+        # Repaint everything on the next draw (new display mode, window exposed)
+        self._drawn_screen = None
+
+    def toggle_redraw_overlay(self):
+        self.show_redraw = not self.show_redraw
+        self.invalidate()
+
+    def draw(self, screen):
+        # Retained mode: the table is split into zones (freecells, foundations, columns, buttons,
+        # texts, hint frames) and a zone is only repainted when what it shows changed, or when
+        # a repainted zone or a flying card overlaps it. Returns the changed screen rects, for
+        # pygame.display.update
+        layout = self.get_layout(screen)
+        scale = layout.scale
+        card_size = (layout.card_w, layout.card_h)
+        zones = self.build_zones(screen, layout, pygame.mouse.get_pos(), self.tweens.flying())
+        if screen is not self._drawn_screen or screen.get_size() != self._drawn_size:
+            self._drawn_screen, self._drawn_size = screen, screen.get_size()
+            self._drawn = {}
+            self._flying_rects = [screen.get_rect()]
+        # Where the flying cards were last frame and where they are now
+        areas = self._flying_rects
+        flying = []
+        for tween in self.tweens.tweens:
+            start = layout.card_pos(*tween.src)
+            end = layout.card_pos(*tween.dst)
+            t = tween.progress()
+            x, y = int(start[0] + (end[0] - start[0]) * t), int(start[1] + (end[1] - start[1]) * t)
+            for i, card in enumerate(tween.cards):
+                flying.append((card, (x, y + i * layout.row_gap)))
+                areas.append(pygame.Rect((x, y + i * layout.row_gap), card_size))
+        keys = set()
+        for key, rect, sig, paint in zones:
+            keys.add(key)
+            drawn = self._drawn.get(key)
+            if drawn != (rect, sig):
+                if drawn is not None:
+                    areas.append(drawn[0])
+                areas.append(rect)
+        for key in list(self._drawn):
+            if key not in keys:
+                areas.append(self._drawn.pop(key)[0])
+        redraw = set()
+        self.spread_redraw(zones, areas, redraw)
+        changed = list(areas)
+        # Last frame's overlay frames are wiped too, without being shown as redrawn
+        areas += self._overlay_rects
+        self.spread_redraw(zones, areas, redraw)
+        for area in areas:
+            screen.fill(BG_COLOR, area)
+        for key, rect, sig, paint in zones:
+            if key in redraw:
+                paint(screen)
+                self._drawn[key] = (rect, sig)
+        for card, pos in flying:
+            card.draw(screen, pos, scale=scale)
+        self._flying_rects = [pygame.Rect(pos, card_size) for card, pos in flying]
+        self._overlay_rects = []
+        if self.show_redraw:
+            for rect in changed:
+                pygame.draw.rect(screen, (255, 0, 255), rect, 1)
+            self._overlay_rects = changed
+        screen_rect = screen.get_rect()
+        return [rect.clip(screen_rect) for rect in areas]
+
+    def spread_redraw(self, zones, areas, redraw):
+        # Repainting wipes whatever overlaps the area, so every zone touching one is repainted
+        # too (and its own rect becomes an area)
+        grown = True
+        while grown:
+            grown = False
+            for key, rect, sig, paint in zones:
+                if key not in redraw and rect.collidelist(areas) != -1:
+                    redraw.add(key)
+                    areas.append(rect)
+                    grown = True
+
+    def build_zones(self, screen, layout, mouse_pos, flying):
+        # (key, rect, signature, paint) in painting order; the signature holds everything the zone
+        # shows, so an unchanged signature means the pixels on screen are still right
+        scale = layout.scale
+        MARG = layout.margin
+        UNDO_SIZE = layout.button_size
+        UNDO_MARGIN = layout.button_margin
         screen_height = screen.get_height()
-        screen.fill(BG_COLOR)
-        # Store hitboxes for click detection (freecells and tableau tops)
-        self._last_hover_boxes = []
-        # Draw freecells
-        for i in range(5):
-            x = int(self.base_margin * scale) + i * (int(self.base_card_width * scale) + int(self.base_freecell_gap * scale))
-            y = int(self.base_margin * scale)
-            rect = pygame.Rect(x, y, int(self.base_card_width * scale), int(self.base_card_height * scale))
-            pygame.draw.rect(screen, CARD_COLOR, rect, 2, border_radius=int(12*scale))
-            card = self.freecells[i]
-            if self.animating_card_info == ('freecell', i):
-                continue
-            hovered = card and rect.collidepoint(mouse_pos)
-            if card:
-                card.draw(screen, (x, y), self.selected == ('freecell', i, card), hovered=hovered, small=False, scale=scale)
-                self._last_hover_boxes.append(('freecell', i, card, rect))
-        # Draw small foundations (move them closer to the right edge)
-        foundation_area_width = 4 * (FOUNDATION_W + FOUNDATION_G) - FOUNDATION_G
-        foundation_start_x = screen_width - MARG - foundation_area_width
-        for i, suit in enumerate(SUITS):
-            x = foundation_start_x + i * (FOUNDATION_W + FOUNDATION_G)
-            y = MARG + int(10*scale)
-            rect = pygame.Rect(x, y, FOUNDATION_W, FOUNDATION_H)
-            pygame.draw.rect(screen, CARD_COLOR, rect, 2, border_radius=int(8*scale))
-            pile = self.foundations[suit]
-            if pile and self.animating_card_info == ('foundation', i):
-                continue
-            if pile:
-                pile[-1].draw(screen, (x, y), small=True, scale=scale)
-            suit_text = SMALL_FONT.render(suit, True, BLACK)
-            screen.blit(suit_text, (x + FOUNDATION_W//2 - 8, y + FOUNDATION_H - 20))
-        # Draw tableau
-        for col in range(8):
-            x = int(self.base_margin * scale) + col * (int(self.base_card_width * scale) + int(self.base_tableau_gap * scale))
-            y = int(self.base_margin * scale) + int(self.base_card_height * scale) + int(60*scale)
-            for row, card in enumerate(self.tableau[col]):
-                if self.animating_card_info == ('tableau', (col, row)):
-                    continue
-                offset_y = y + row * int(30*scale)
-                rect = pygame.Rect(x, offset_y, int(self.base_card_width * scale), int(self.base_card_height * scale))
-                hovered = card and rect.collidepoint(mouse_pos) and row == len(self.tableau[col])-1
-                card.draw(screen, (x, offset_y), self.selected == ('tableau', col, card) and row == len(self.tableau[col])-1, hovered=hovered, small=False, scale=scale)
-                if row == len(self.tableau[col])-1:
-                    self._last_hover_boxes.append(('tableau', col, card, rect))
-            if not self.tableau[col]:
-                rect = pygame.Rect(x, y, int(self.base_card_width * scale), int(self.base_card_height * scale))
+        freecells, foundations, tableau = self.freecells, self.foundations, self.tableau
+        hover = self.get_card_at_pos(mouse_pos, flying)
+        zones = []
+        # Freecells
+        for i in range(NUM_FREECELLS):
+            rect = layout.freecell_rect(i)
+            card = freecells[i]
+            if card in flying:
+                card = None
+            hovered = bool(card and hover == ('freecell', i, card))
+            selected = bool(card and self.selected == ('freecell', i, card))
+            def paint(screen, rect=rect, card=card, hovered=hovered, selected=selected):
                 pygame.draw.rect(screen, CARD_COLOR, rect, 2, border_radius=int(12*scale))
-        # Draw undo button (circle arrow) at bottom right
-        undo_btn_rect = pygame.Rect(
-            screen_width - UNDO_SIZE*2 - UNDO_MARGIN*2,
-            screen_height - UNDO_SIZE - UNDO_MARGIN,
-            UNDO_SIZE,
-            UNDO_SIZE
-        )
-        restart_btn_rect = pygame.Rect(
-            screen_width - UNDO_SIZE - UNDO_MARGIN,
-            screen_height - UNDO_SIZE - UNDO_MARGIN,
-            UNDO_SIZE,
-            UNDO_SIZE
-        )
-        self.undo_btn_rect = undo_btn_rect
-        self.restart_btn_rect = restart_btn_rect
-        pygame.draw.circle(screen, (220,220,220), undo_btn_rect.center, UNDO_SIZE//2)
-        pygame.draw.circle(screen, (100,100,100), undo_btn_rect.center, UNDO_SIZE//2, 2)
-        cx, cy = undo_btn_rect.center
-        r = UNDO_SIZE//3
-        pygame.draw.arc(screen, (60,60,60), (cx-r, cy-r, 2*r, 2*r), 0.7, 2.5, 4)
-        arrow_tip = (int(cx + r*0.9), int(cy - r*0.2))
-        pygame.draw.polygon(screen, (60,60,60), [arrow_tip, (arrow_tip[0]-int(10*scale), arrow_tip[1]-int(5*scale)), (arrow_tip[0]-int(5*scale), arrow_tip[1]+int(10*scale))])
-        # Draw restart button (circular arrow with dot) at bottom right
-        pygame.draw.circle(screen, (220,220,220), restart_btn_rect.center, UNDO_SIZE//2)
-        pygame.draw.circle(screen, (100,100,100), restart_btn_rect.center, UNDO_SIZE//2, 2)
-        cx, cy = restart_btn_rect.center
-        r = UNDO_SIZE//3
-        pygame.draw.arc(screen, (60,60,60), (cx-r, cy-r, 2*r, 2*r), 0.7, 2.5, 4)
-        pygame.draw.circle(screen, (60,60,60), (int(cx + r*0.7), int(cy)), int(5*scale))
+                if card:
+                    card.draw(screen, rect.topleft, selected, hovered=hovered, small=False, scale=scale)
+            zones.append((('freecell', i), rect, (card and card.id, hovered, selected), paint))
+        # Small foundations, close to the right edge
+        for i, suit in enumerate(SUITS):
+            rect = layout.foundation_rect(i)
+            pile = foundations[suit]
+            while pile and pile[-1] in flying:
+                pile = pile[:-1]
+            top = pile[-1] if pile else None
+            def paint(screen, rect=rect, top=top, suit=suit):
+                pygame.draw.rect(screen, CARD_COLOR, rect, 2, border_radius=int(8*scale))
+                if top:
+                    top.draw(screen, rect.topleft, small=True, scale=scale)
+                suit_text = SMALL_FONT.render(suit, True, BLACK)
+                screen.blit(suit_text, (rect.x + layout.foundation_w//2 - 8, rect.y + layout.foundation_h - 20))
+            zones.append((('foundation', i), rect, top and top.id, paint))
+        # Tableau
+        for col in range(NUM_COLUMNS):
+            cards = [card for card in tableau[col] if card not in flying]
+            rect = layout.column_rect(col, len(cards))
+            # The hovered card is lit with the cards on it, which would move along
+            hovered = len(cards)
+            selected = False
+            if cards:
+                if hover and hover[:2] == ('tableau', col):
+                    hovered = cards.index(hover[2])
+                selected = self.selected == ('tableau', col, cards[-1])
+            def paint(screen, col=col, cards=cards, hovered=hovered, selected=selected):
+                for row, card in enumerate(cards):
+                    last = row == len(cards) - 1
+                    card.draw(screen, layout.card_rect(col, row).topleft, selected and last, hovered=row >= hovered, small=False, scale=scale)
+                if not cards:
+                    pygame.draw.rect(screen, CARD_COLOR, layout.card_rect(col, 0), 2, border_radius=int(12*scale))
+            zones.append((('tableau', col), rect, (tuple(card.id for card in cards), hovered, selected), paint))
+        # Undo button (circle arrow) and restart button (circular arrow with dot) at bottom right
+        undo_btn_rect = layout.undo_rect
+        restart_btn_rect = layout.restart_rect
+        def paint(screen):
+            pygame.draw.circle(screen, (220,220,220), undo_btn_rect.center, UNDO_SIZE//2)
+            pygame.draw.circle(screen, (100,100,100), undo_btn_rect.center, UNDO_SIZE//2, 2)
+            cx, cy = undo_btn_rect.center
+            r = UNDO_SIZE//3
+            pygame.draw.arc(screen, (60,60,60), (cx-r, cy-r, 2*r, 2*r), 0.7, 2.5, 4)
+            arrow_tip = (int(cx + r*0.9), int(cy - r*0.2))
+            pygame.draw.polygon(screen, (60,60,60), [arrow_tip, (arrow_tip[0]-int(10*scale), arrow_tip[1]-int(5*scale)), (arrow_tip[0]-int(5*scale), arrow_tip[1]+int(10*scale))])
+            pygame.draw.circle(screen, (220,220,220), restart_btn_rect.center, UNDO_SIZE//2)
+            pygame.draw.circle(screen, (100,100,100), restart_btn_rect.center, UNDO_SIZE//2, 2)
+            cx, cy = restart_btn_rect.center
+            pygame.draw.arc(screen, (60,60,60), (cx-r, cy-r, 2*r, 2*r), 0.7, 2.5, 4)
+            pygame.draw.circle(screen, (60,60,60), (int(cx + r*0.7), int(cy)), int(5*scale))
+        zones.append(('buttons', undo_btn_rect.union(restart_btn_rect), None, paint))
         if self.win:
             win_text = FONT.render('Congratulations! You won!', True, (255,255,0))
-            screen.blit(win_text, (MARG, 10 + CARD_HEIGHT + 8*30))
             restart_text = SMALL_FONT.render('Press R to restart', True, (255,255,255))
-            screen.blit(restart_text, (MARG, 40 + CARD_HEIGHT + 8*30))
-        if anim_card is not None:
-            card, pos = anim_card
-            card.draw(screen, pos, scale=scale)
-        pygame.display.flip()
-        # Draw the back arrow on top of everything
-        draw_back_arrow(screen)
-
-    def get_scale(self, screen):
-        w, h = screen.get_width(), screen.get_height()
-        scale_x = w / self.base_screen_width
-        scale_y = h / self.base_screen_height
-        return min(scale_x, scale_y)
-
-    def process_animations(self, screen):
-        if not self.animations:
-            self.animating = False
-            self.animating_card_info = None
-            self.auto_move_to_foundation(screen)
+            rect = win_text.get_rect(topleft=(MARG, 10 + CARD_HEIGHT + 8*30)).union(restart_text.get_rect(topleft=(MARG, 40 + CARD_HEIGHT + 8*30)))
+            def paint(screen):
+                screen.blit(win_text, (MARG, 10 + CARD_HEIGHT + 8*30))
+                screen.blit(restart_text, (MARG, 40 + CARD_HEIGHT + 8*30))
+            zones.append(('win', rect, None, paint))
+        if self.hint is not None and not self.animating:
+            for i, slot in enumerate(self.hint[:2]):
+                rect = self.get_slot_rect(slot, screen)
+                def paint(screen, rect=rect):
+                    pygame.draw.rect(screen, SELECTED_COLOR, rect, 4, border_radius=int(12*scale))
+                zones.append((('hint', i), rect, None, paint))
+        if self.deal_entry is not None:
+            label = f'Deal #: {self.deal_entry}_  (Enter to play, Esc to cancel)'
+        else:
+            minutes, seconds = divmod(int(self.elapsed), 60)
+            label = f'Deal #{self.deal_number}' + (' (MS)' if self.ms else '') + f'  {minutes}:{seconds:02d}'
+        deal_text = SMALL_FONT.render(label, True, (255,255,255))
+        rect = deal_text.get_rect(topleft=(undo_btn_rect.left - deal_text.get_width() - UNDO_MARGIN, undo_btn_rect.centery - deal_text.get_height()//2))
+        zones.append(('deal', rect, label, lambda screen, rect=rect: screen.blit(deal_text, rect)))
+        if self.status:
+            status_text = SMALL_FONT.render(self.status, True, (255,255,255))
+            rect = status_text.get_rect(topleft=(MARG, screen_height - status_text.get_height() - UNDO_MARGIN))
+            zones.append(('status', rect, self.status, lambda screen, rect=rect: screen.blit(status_text, rect)))
+        # The back arrow on top of everything
+        zones.append(('arrow', pygame.Rect(18, 18, 48, 48), None, draw_back_arrow))
+        return zones
+
+    def get_slot_rect(self, slot, screen):
+        # Screen rect of the top card of a slot (or of the empty slot)
+        length = len(self.state.tableau[slot]) if slot < FREECELL_SLOT else 0
+        return self.get_layout(screen).slot_rect(slot, length)
+
+    def save_state(self):
+        # Start a new undo step; the moves of this action (and the auto moves after it) join it
+        self.begin_undo_group()
+
+    def do_move(self, move):
+        plan = self.current_plan()
+        super().do_move(move)
+        self.unsaved = True
+        self.hint = None
+        # Following the solution keeps the rest of it valid
+        if plan and plan[0] == move:
+            self.plan = (self.state.key(), plan[1:])
+
+    def update(self, dt):
+        # Called once per frame from the game loop with the seconds since the last frame
+        if not self.win:
+            self.elapsed += dt
+        if pygame.key.get_mods() & pygame.KMOD_SHIFT:
+            dt *= FAST_FORWARD
+        self.tweens.update(dt)
+        self.update_solver()
+        if self.unsaved:
+            self.save()
+
+    def save(self):
+        # Keep the running game on disk (a won game has nothing left to resume)
+        self.unsaved = False
+        if not self.save_path:
             return
-        card, start, end, on_complete, from_zone, from_idx = self.animations[0]
-        duration = 0.5  # seconds for animation
-        fps = 60
-        frames = int(duration * fps)
-        clock = pygame.time.Clock()
-        for i in range(1, frames+1):
-            t = i / frames
-            x = int(start[0] + (end[0] - start[0]) * t)
-            y = int(start[1] + (end[1] - start[1]) * t)
-            self.draw(screen, anim_card=(card, (x, y)))
-            # --- Use present_surface callback if set ---
-            if callable(globals().get("present_surface", None)):
-                globals()["present_surface"](screen)
+        try:
+            if self.win:
+                remove_session(self.save_path)
             else:
-                pygame.display.flip()
-            clock.tick(fps)
-        on_complete()
-        self.animations.pop(0)
-        self.animating = False
-        self.animating_card_info = None
-        self.auto_move_to_foundation(screen)
+                save_session(self, self.save_path)
+        except OSError:
+            pass
 
-    def save_state(self):
-        # Save a deep copy of the current state for undo
-        import copy
-        self.move_history.append((copy.deepcopy(self.freecells), copy.deepcopy(self.foundations), copy.deepcopy(self.tableau)))
-        if len(self.move_history) > 100:
-            self.move_history.pop(0)
+    def skip_animations(self):
+        self.tweens.finish_all()
 
     def undo(self):
-        if self.move_history:
-            self.freecells, self.foundations, self.tableau = self.move_history.pop()
+        # Cards still in flight land at once, then the last step is taken back
+        self.skip_animations()
+        self.autosolving = False
+        self.hint = None
+        if super().undo():
             self.win = False
+            self.unsaved = True
+            return True
+        return False
+
+    @classmethod
+    def resume(cls, path=SAVE_PATH):
+        game = super().resume(path)
+        if game is not None:
+            game.save_path = path
+            game.unsaved = False
+        return game
 
     def restart(self):
-        self.__init__()
+        self.solver.cancel()
+        self.__init__(ms=self.ms, save_path=self.save_path)
+
+    def play_deal(self, number):
+        self.solver.cancel()
+        self.__init__(number, self.ms, self.save_path)
+
+    def start_deal_entry(self):
+        self.deal_entry = ''
+
+    def handle_deal_key(self, event):
+        # Typing a deal number: digits, Backspace, Enter to play it, Escape to cancel
+        if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+            number = int(self.deal_entry) if self.deal_entry else 0
+            self.deal_entry = None
+            if 1 <= number <= MAX_DEAL:
+                self.play_deal(number)
+        elif event.key == pygame.K_ESCAPE:
+            self.deal_entry = None
+        elif event.key == pygame.K_BACKSPACE:
+            self.deal_entry = self.deal_entry[:-1]
+        elif event.unicode.isdigit() and len(self.deal_entry) < len(str(MAX_DEAL)):
+            self.deal_entry += event.unicode
+
+    # --- Hint (H) and auto-solve (S) ---
+
+    def current_plan(self):
+        # Remaining solution moves if the last solution belongs to the current position
+        if self.plan is not None and self.plan[0] == self.state.key():
+            return self.plan[1]
+        return None
+
+    def request_solution(self, mode):
+        if self.win or self.solver.busy():
+            return
+        if self.current_plan() is not None:
+            self.use_plan(mode)
+            return
+        self.solver_mode = mode
+        self.status = 'Solving...'
+        self.solver.start(self.state)
+
+    def request_hint(self):
+        self.request_solution('hint')
+
+    def auto_solve(self):
+        self.request_solution('solve')
+
+    def use_plan(self, mode):
+        moves = self.current_plan()
+        if not moves:
+            return
+        if mode == 'hint':
+            self.hint = moves[0]
+            self.status = ''
+        else:
+            self.autosolving = True
+            self.status = 'Auto-solving... (P to stop)'
+
+    def update_solver(self):
+        # Collects the solver result and plays the next auto-solve move once the last one has landed
+        if self.solver.busy() and self.solver.poll():
+            mode, self.solver_mode = self.solver_mode, None
+            if self.solver.key != self.state.key():
+                # The player moved while the solver ran: search again from the new position
+                self.status = ''
+                self.request_solution(mode)
+            elif self.solver.result is None:
+                self.status = 'No solution found'
+            else:
+                self.plan = (self.solver.key, self.solver.result)
+                self.use_plan(mode)
+        if self.autosolving and not self.animating:
+            moves = self.current_plan()
+            if moves is None:
+                # The position changed under the plan, search again
+                self.autosolving = False
+                self.auto_solve()
+            elif not moves:
+                self.autosolving = False
+                self.status = ''
+            else:
+                self.save_state()
+                self.animate_slot_move(moves[0])
+
+    def animate_slot_move(self, move, delay=0.0):
+        # A sequence move flies as one group
+        src, dst, count = move
+        from_zone, from_idx = self.slot_zone(src, -count)
+        to_zone, to_idx = self.slot_zone(dst, 0)
+        if src < FREECELL_SLOT:
+            cards = [self.cards[c] for c in self.state.tableau[src][-count:]]
+        else:
+            cards = [self.cards[self.state.top(src)]]
+        self.animate_move(cards, from_zone, from_idx, to_zone, to_idx, move, delay)
+
+    def slot_zone(self, slot, row_offset):
+        # (zone, idx) as used by animate_move; row_offset -1 is the top card, -n the n-th card from the
+        # top, 0 the place above it
+        if slot < FREECELL_SLOT:
+            return 'tableau', (slot, len(self.state.tableau[slot]) + row_offset)
+        if slot < FOUNDATION_SLOT:
+            return 'freecell', slot - FREECELL_SLOT
+        return 'foundation', slot - FOUNDATION_SLOT
 
     def check_win(self):
         if self.is_won():
             self.win = True
 
-    def get_card_at_pos(self, pos):
-        # Freecells
-        for i, card in enumerate(self.freecells):
-            x = MARGIN + i * (CARD_WIDTH + FREECELL_GAP)
-            y = MARGIN
-            rect = pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT)
-            if card and rect.collidepoint(pos):
-                return ('freecell', i, card)
-        # Tableau
-        for col in range(8):
-            x = MARGIN + col * (CARD_WIDTH + TABLEAU_GAP)
-            y = MARGIN + CARD_HEIGHT + 60
-            for row, card in enumerate(self.tableau[col]):
-                offset_y = y + row * 30
-                rect = pygame.Rect(x, offset_y, CARD_WIDTH, CARD_HEIGHT)
-                if rect.collidepoint(pos) and row == len(self.tableau[col])-1:
-                    return ('tableau', col, card)
+    # Hit-testing uses the layout of the last frame drawn
+
+    def get_card_at_pos(self, pos, flying=()):
+        # Clickable card under pos: a freecell card or a card of the ordered run on top of a column,
+        # not one still flying
+        layout = self.layout
+        i = layout.freecell_at(pos)
+        if i is not None:
+            card = self.freecells[i]
+            return ('freecell', i, card) if card and card not in flying else None
+        col = layout.column_at(pos)
+        if col is not None:
+            column = self.state.tableau[col]
+            row = layout.row_at(pos, len(column))
+            if row is not None and len(column) - row <= run_length(column) and self.cards[column[-1]] not in flying:
+                return ('tableau', col, self.cards[column[row]])
         return None
     def get_foundation_at_pos(self, pos):
-        for i, suit in enumerate(SUITS):
-            x = MARGIN + (i + 5) * (CARD_WIDTH + FOUNDATION_GAP)
-            y = MARGIN + 10
-            rect = pygame.Rect(x, y, FOUNDATION_WIDTH, FOUNDATION_HEIGHT)
-            if rect.collidepoint(pos):
-                return suit
-        return None
+        i = self.layout.foundation_at(pos)
+        return None if i is None else SUITS[i]
     def get_freecell_at_pos(self, pos):
-        for i in range(5):
-            x = MARGIN + i * (CARD_WIDTH + FREECELL_GAP)
-            y = MARGIN
-            rect = pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT)
-            if rect.collidepoint(pos):
-                return i
-        return None
+        return self.layout.freecell_at(pos)
     def get_tableau_at_pos(self, pos):
-        for col in range(8):
-            x = MARGIN + col * (CARD_WIDTH + TABLEAU_GAP)
-            y = MARGIN + CARD_HEIGHT + 60
-            rect = pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT + 30*max(0, len(self.tableau[col])-1))
-            if rect.collidepoint(pos):
-                return col
+        col = self.layout.column_at(pos)
+        if col is not None and self.layout.column_rect(col, len(self.state.tableau[col])).collidepoint(pos):
+            return col
         return None
     def handle_click(self, pos):
-        if self.win or self.animating:
+        if self.win or self.autosolving:
             return
         # Undo button (bottom right)
         if self.undo_btn_rect.collidepoint(pos):
@@ -479,206 +1333,75 @@ class PygameFreecellGame(FreecellGame):
         if self.restart_btn_rect.collidepoint(pos):
             self.restart()
             return
-        # Use the same hitboxes as hover for click detection
-        for zone, idx, card, rect in getattr(self, '_last_hover_boxes', []):
-            if rect.collidepoint(pos):
-                if zone == 'freecell':
-                    i = idx
-                    self.save_state()
-                    suit = card.suit
-                    foundation = self.foundations[suit]
-                    can_move_to_foundation = (
-                        (not foundation and card.rank == 'A') or
-                        (foundation and RANKS.index(card.rank) == RANKS.index(foundation[-1].rank) + 1)
-                    )
-                    if can_move_to_foundation:
-                        def do_move(i=i, suit=suit, card=card):
-                            self.foundations[suit].append(self.freecells[i])
-                            self.freecells[i] = None
-                            self.check_win()
-                        self.animate_move(
-                            card,
-                            'freecell', i,
-                            'foundation', SUITS.index(suit),
-                            do_move
-                        )
-                        return
-                    for tcol in range(8):
-                        if self.move_freecell_to_tableau(i, tcol):
-                            return
-                    return
-                elif zone == 'tableau':
-                    col = idx
-                    row = len(self.tableau[col]) - 1
-                    self.save_state()
-                    suit = card.suit
-                    foundation = self.foundations[suit]
-                    can_move_to_foundation = (
-                        (not foundation and card.rank == 'A') or
-                        (foundation and RANKS.index(card.rank) == RANKS.index(foundation[-1].rank) + 1)
-                    )
-                    if can_move_to_foundation:
-                        def do_move(col=col, suit=suit, card=card):
-                            self.foundations[suit].append(self.tableau[col].pop())
-                            self.check_win()
-                        self.animate_move(
-                            card,
-                            'tableau', (col, row),
-                            'foundation', SUITS.index(suit),
-                            do_move
-                        )
-                        return
-                    for tcol in range(8):
-                        if tcol != col and self.can_move_tableau_to_tableau(col, tcol):
-                            def do_move(col=col, tcol=tcol, card=card):
-                                self.tableau[tcol].append(self.tableau[col].pop())
-                            self.animate_move(
-                                card,
-                                'tableau', (col, row),
-                                'tableau', (tcol, len(self.tableau[tcol])),
-                                do_move
-                            )
-                            return
-                    for fidx in range(5):
-                        if self.freecells[fidx] is None:
-                            def do_move(col=col, fidx=fidx, card=card):
-                                self.freecells[fidx] = self.tableau[col].pop()
-                            self.animate_move(
-                                card,
-                                'tableau', (col, row),
-                                'freecell', fidx,
-                                do_move
-                            )
-                            return
-                    return
-        # At the end of handle_click, after any move, trigger auto move
-        self.auto_move_to_foundation(pygame.display.get_surface())
+        # The same test as the hover highlight
+        hit = self.get_card_at_pos(pos, self.tweens.flying())
+        if hit is not None:
+            zone, idx, card = hit
+            if zone == 'tableau':
+                # The clicked card and the ones on it move together
+                column = self.state.tableau[idx]
+                src, count = idx, len(column) - column.index(card.id)
+            else:
+                src, count = FREECELL_SLOT + idx, 1
+            self.save_state()
+            move = self.click_move(src, count)
+            if move is not None:
+                self.animate_slot_move(move)
+                self.auto_move_to_foundation()
+            return
+        # Clicking elsewhere also sends what can go up to the foundations, as an undo step of its own
+        self.auto_move_to_foundation(new_group=True)
         return
 
-    def animate_move(self, card, from_zone, from_idx, to_zone, to_idx, on_complete):
-        start = self.get_card_screen_pos(from_zone, from_idx)
-        end = self.get_card_screen_pos(to_zone, to_idx)
-        self.animations.append((card, start, end, on_complete, from_zone, from_idx))
-        self.animating = True
-        self.animating_card_info = (from_zone, from_idx)
+    def click_move(self, src, count=1):
+        # Where a clicked card goes: its foundation, else a column (in column order), else a freecell.
+        # A card inside the run on top of a column takes the cards on it along
+        moves = [m for m in legal_moves(self.state) if m[0] == src and m[2] == count]
+        if not moves:
+            return None
+        return min(moves, key=lambda m: (m[1] < FOUNDATION_SLOT, m[1] >= FREECELL_SLOT, m[1]))
 
-    def get_card_screen_pos(self, zone, idx):
-        # Returns the (x, y) pixel position for a card in a given zone
-        if zone == 'freecell':
-            x = MARGIN + idx * (CARD_WIDTH + FREECELL_GAP)
-            y = MARGIN
-            return (x, y)
-        elif zone == 'foundation':
-            x = MARGIN + (idx + 5) * (FOUNDATION_WIDTH + FOUNDATION_GAP)
-            y = MARGIN + 10
-            return (x, y)
-        elif zone == 'tableau':
-            col, row = idx
-            x = MARGIN + col * (CARD_WIDTH + TABLEAU_GAP)
-            y = MARGIN + CARD_HEIGHT + 60 + row * 30
-            return (x, y)
-        return (0, 0)
+    def animate_move(self, cards, from_zone, from_idx, to_zone, to_idx, move, delay=0.0):
+        # The move is applied (and recorded for undo) right away, so input is never blocked;
+        # the tween only shows the cards travelling
+        self.do_move(move)
+        self.check_win()
+        self.tweens.add(Tween(cards, (from_zone, from_idx), (to_zone, to_idx), delay=delay))
+
+    def get_card_screen_pos(self, zone, idx, screen=None):
+        # Returns the (x, y) pixel position for a card in a given zone, at the screen's scale
+        return self.get_layout(screen or pygame.display.get_surface()).card_pos(zone, idx)
 
     def can_move_tableau_to_tableau(self, from_col, to_col):
-        if not self.tableau[from_col]:
-            return False
-        card = self.tableau[from_col][-1]
-        if not self.tableau[to_col]:
-            return True
-        top = self.tableau[to_col][-1]
-        if top.suit in ['♠', '♣']:
-            valid = card.suit in ['♥', '♦']
-        else:
-            valid = card.suit in ['♠', '♣']
-        return valid and card.value == top.value - 1
+        return sequence_move(self.state, from_col, to_col) is not None
 
     def can_move_tableau_to_foundation(self, t_col):
-        if not self.tableau[t_col]:
+        if not self.state.tableau[t_col]:
             return False
-        card = self.tableau[t_col][-1]
-        foundation = self.foundations[card.suit]
-        return (not foundation and card.rank == 'A') or (foundation and RANKS.index(card.rank) == RANKS.index(foundation[-1].rank) + 1)
+        return self.state.can_found(self.state.tableau[t_col][-1])
 
     def can_move_freecell_to_tableau(self, f_idx, t_col):
-        card = self.freecells[f_idx]
+        card = self.state.freecells[f_idx]
         if card is None:
             return False
-        if not self.tableau[t_col]:
-            return True
-        top = self.tableau[t_col][-1]
-        if top.suit in ['♠', '♣']:
-            valid = card.suit in ['♥', '♦']
-        else:
-            valid = card.suit in ['♠', '♣']
-        return valid and card.value == top.value - 1
+        return self.state.can_stack(card, t_col)
 
     def can_move_freecell_to_foundation(self, f_idx):
-        card = self.freecells[f_idx]
+        card = self.state.freecells[f_idx]
         if card is None:
             return False
-        foundation = self.foundations[card.suit]
-        return (not foundation and card.rank == 'A') or (foundation and RANKS.index(card.rank) == RANKS.index(foundation[-1].rank) + 1)
+        return self.state.can_found(card)
 
-    def auto_move_to_foundation(self, screen=None):
-        while True:
-            moved = False
-            # Check tableau tops
-            for col in range(8):
-                if self.tableau[col]:
-                    card = self.tableau[col][-1]
-                    suit = card.suit
-                    foundation = self.foundations[suit]
-                    can_move_to_foundation = (
-                        (not foundation and card.rank == 'A') or
-                        (foundation and RANKS.index(card.rank) == RANKS.index(foundation[-1].rank) + 1)
-                    )
-                    if can_move_to_foundation:
-                        row = len(self.tableau[col]) - 1
-                        def do_move(col=col, suit=suit, card=card):
-                            self.foundations[suit].append(self.tableau[col].pop())
-                            self.check_win()
-                        self.animate_move(
-                            card,
-                            'tableau', (col, row),
-                            'foundation', SUITS.index(suit),
-                            do_move
-                        )
-                        moved = True
-                        break  # Only one move per call
-            if moved and screen:
-                while self.animations:
-                    self.process_animations(screen)
-                continue
-            if moved:
-                continue
-            # Check freecells
-            for i, card in enumerate(self.freecells):
-                if card:
-                    suit = card.suit
-                    foundation = self.foundations[suit]
-                    can_move_to_foundation = (
-                        (not foundation and card.rank == 'A') or
-                        (foundation and RANKS.index(card.rank) == RANKS.index(foundation[-1].rank) + 1)
-                    )
-                    if can_move_to_foundation:
-                        def do_move(i=i, suit=suit, card=card):
-                            self.foundations[suit].append(self.freecells[i])
-                            self.freecells[i] = None
-                            self.check_win()
-                        self.animate_move(
-                            card,
-                            'freecell', i,
-                            'foundation', SUITS.index(suit),
-                            do_move
-                        )
-                        moved = True
-                        break  # Only one move per call
-            if moved and screen:
-                while self.animations:
-                    self.process_animations(screen)
-                continue
-            if not moved:
-                break
+    def auto_move_to_foundation(self, new_group=False):
+        # Safe autoplay: the cards no other card can still need go up, all found in one pass and
+        # flown as one staggered sequence. Other cards that fit stay for the player to click
+        if self.autosolving:
+            return  # the solution already contains its foundation moves
+        moves = play_safe_moves(self.state.copy())
+        if moves and new_group:
+            self.save_state()
+        for i, move in enumerate(moves):
+            self.animate_slot_move(move, (i + 1) * AUTO_STAGGER)
 
 def draw_back_arrow(surface):
     # Draw a back arrow at the top left (same as launcher)
@@ -693,37 +1416,61 @@ def draw_back_arrow(surface):
     pygame.draw.polygon(surface, (60, 60, 60), pts)
     return arrow_rect
 
-def main():
+def main(deal_number=None, ms=False):
     screen = pygame.display.set_mode((MARGIN*2 + 8*(CARD_WIDTH+TABLEAU_GAP)-TABLEAU_GAP, 700), pygame.RESIZABLE)
     pygame.display.set_caption('Freecell (5 Freecells)')
-    game = PygameFreecellGame()
+    # Pick up the saved game unless a deal was asked for
+    game = None if deal_number is not None else PygameFreecellGame.resume()
+    game = game or PygameFreecellGame(deal_number, ms)
     clock = pygame.time.Clock()
+    dt = 0.0
     while game.running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 game.running = False
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 game.handle_click(event.pos)
+            elif event.type == pygame.VIDEOEXPOSE:
+                game.invalidate()
             elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r:
+                if game.deal_entry is not None:
+                    game.handle_deal_key(event)
+                elif event.key == pygame.K_r:
                     game.restart()
+                elif event.key == pygame.K_d:
+                    game.start_deal_entry()
                 elif event.key == pygame.K_p:
                     game.undo()
+                elif event.key == pygame.K_h:
+                    game.request_hint()
+                elif event.key == pygame.K_s:
+                    game.auto_solve()
+                elif event.key == pygame.K_SPACE:
+                    game.skip_animations()
+                elif event.key == pygame.K_F3:
+                    game.toggle_redraw_overlay()
                 elif event.key == pygame.K_ESCAPE:
                     game.running = False
-        if game.animations:
-            game.process_animations(screen)
-        else:
-            game.draw(screen)
+        game.update(dt)
+        pygame.display.update(game.draw(screen))
         fps = clock.get_fps()
         pygame.display.set_caption(f'Freecell (5 Freecells) - FPS: {fps:.1f}')
-        clock.tick(60)  # Cap the game loop at 60 FPS
+        dt = clock.tick(60) / 1000  # Cap the game loop at 60 FPS
+    game.save()
     pygame.quit()
     sys.exit()
 
 if __name__ == '__main__':
-    main()
-
-if __name__ == '__main__':
-    main()
-    main()
+    parser = argparse.ArgumentParser(description='Freecell (5 free cells)')
+    parser.add_argument('--batch', nargs=2, type=int, metavar=('FIRST', 'LAST'), help='solve deals FIRST..LAST and log the results')
+    parser.add_argument('--log', default='freecell_batch.bin', help='batch result log (resumed if it exists)')
+    parser.add_argument('--max-states', type=int, default=50000, help='closed set limit per deal')
+    parser.add_argument('--time', type=float, default=10.0, help='seconds per deal, 0 for no limit')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--deal', type=int, default=None, help='play this deal number')
+    parser.add_argument('--ms', action='store_true', help='Microsoft deal numbering')
+    args = parser.parse_args()
+    if args.batch:
+        batch_solve(args.batch[0], args.batch[1], args.log, args.max_states, args.time, args.jobs, args.ms)
+    else:
+        main(args.deal, args.ms)
@@ -18,6 +18,8 @@ BTN_COLOR = (60, 120, 220)
 BTN_HOVER = (90, 160, 255)
 BTN_TEXT = (255, 255, 255)
 ARROW_COLOR = (60, 60, 60)
+CONNECTFOUR_SIZES = [(7, 6, 4), (9, 7, 4), (12, 10, 5), (20, 15, 5)]  # (cols, rows, connect)
+TICTACTOE_SIZES = [(3, 3), (7, 4), (10, 5), (15, 5)]  # (size, in a row)
 
 pygame.init()
 screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
@@ -89,11 +91,11 @@ def main_menu():
                         set_display_mode(WIDTH, HEIGHT, 0)
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 if btn1.collidepoint(event.pos):
-                    run_tictactoe()
+                    tictactoe_mode_menu()
                 elif btn2.collidepoint(event.pos):
                     run_freecell()
                 elif btn3.collidepoint(event.pos):
-                    run_connectfour()
+                    connectfour_mode_menu()
                 elif btn4.collidepoint(event.pos):
                     dotsandboxes_difficulty_menu()
 
@@ -134,7 +136,45 @@ def dotsandboxes_difficulty_menu():
                     run_dotsandboxes("hard")
                     return
 
-def run_tictactoe():
+def tictactoe_mode_menu():
+    global WIDTH, HEIGHT, screen, DISPLAY_MODE
+    btn_two = pygame.Rect(WIDTH//2 - 150, 180, 300, 70)
+    btn_ai = pygame.Rect(WIDTH//2 - 150, 280, 300, 70)
+    btn_size = pygame.Rect(WIDTH//2 - 150, 380, 300, 70)
+    size_idx = 0
+    running = True
+    while running:
+        screen.fill(BG_COLOR)
+        title = font.render("Tic-Tac-Toe", True, (255,255,255))
+        screen.blit(title, (WIDTH//2 - title.get_width()//2, 60))
+        mouse = pygame.mouse.get_pos()
+        n, k = TICTACTOE_SIZES[size_idx]
+        draw_button(btn_two, "2 Players", btn_two.collidepoint(mouse))
+        draw_button(btn_ai, "Vs Computer", btn_ai.collidepoint(mouse))
+        draw_button(btn_size, f"{n}x{n}, {k} in a row", btn_size.collidepoint(mouse))
+        pygame.display.flip()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.VIDEORESIZE:
+                WIDTH, HEIGHT = event.w, event.h
+                DISPLAY_MODE = 0
+                screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    return
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                if btn_two.collidepoint(event.pos):
+                    run_tictactoe(size=TICTACTOE_SIZES[size_idx])
+                    return
+                elif btn_ai.collidepoint(event.pos):
+                    run_tictactoe(vs_ai=True, size=TICTACTOE_SIZES[size_idx])
+                    return
+                elif btn_size.collidepoint(event.pos):
+                    size_idx = (size_idx + 1) % len(TICTACTOE_SIZES)
+
+def run_tictactoe(vs_ai=False, size=(3, 3)):
     global WIDTH, HEIGHT, screen, DISPLAY_MODE
     # Do not resize window, just update caption and pass current size
     pygame.display.set_caption("Tic-Tac-Toe")
@@ -142,7 +182,9 @@ def run_tictactoe():
         return draw_back_arrow()
     import importlib
     importlib.reload(tictactoe)
+    tictactoe.configure(*size)
     orig_main = tictactoe.main
+    ai = tictactoe.make_player(*size) if vs_ai else None  # the computer plays O
     def main_with_back():
         global WIDTH, HEIGHT, screen, DISPLAY_MODE
         tictactoe.WIDTH, tictactoe.HEIGHT = WIDTH, HEIGHT
@@ -151,6 +193,11 @@ def run_tictactoe():
         while running:
             tictactoe.WIDTH, tictactoe.HEIGHT = WIDTH, HEIGHT
             tictactoe.screen = screen
+            if ai and tictactoe.turn == 'O' and not tictactoe.winner:
+                x, y = ai.best_move(tictactoe.current_board, 'O')
+                tictactoe.winner, tictactoe.win_line = tictactoe.place_symbol(tictactoe.current_board, x, y, 'O')
+                tictactoe.animated = False
+                tictactoe.turn = 'X'
             tictactoe.draw_board(tictactoe.current_board)
             tictactoe.draw_scores()
             btn_rect = tictactoe.draw_restart_button()
@@ -161,13 +208,13 @@ def run_tictactoe():
                     tictactoe.animated = True
                 elif tictactoe.win_line and tictactoe.animated:
                     board_rect = tictactoe.get_board_rect()
-                    cell_size = board_rect.width // 3
+                    cell_size = board_rect.width // tictactoe.N
                     start_cell, end_cell = tictactoe.win_line
                     start_px = (board_rect.left + start_cell[0] * cell_size + cell_size // 2,
                                 board_rect.top + start_cell[1] * cell_size + cell_size // 2)
                     end_px = (board_rect.left + end_cell[0] * cell_size + cell_size // 2,
                               board_rect.top + end_cell[1] * cell_size + cell_size // 2)
-                    pygame.draw.line(screen, (0, 180, 0), start_px, end_px, 10)
+                    pygame.draw.line(screen, (0, 180, 0), start_px, end_px, min(10, max(3, cell_size // 10)))
                 msg = f"{tictactoe.winner} gagne !" if tictactoe.winner in ['X', 'O'] else "Match nul !"
                 text = tictactoe.small_font.render(msg, True, (0, 128, 0))
                 screen.blit(text, (tictactoe.WIDTH//2 - text.get_width()//2, tictactoe.HEIGHT//2 - text.get_height()//2))
@@ -196,36 +243,23 @@ def run_tictactoe():
                     if arrow_rect.collidepoint(mx, my):
                         return
                     if btn_rect.collidepoint(mx, my):
-                        tictactoe.current_board = [['' for _ in range(3)] for _ in range(3)]
+                        tictactoe.current_board = tictactoe.new_board()
                         tictactoe.turn = 'X'
                         tictactoe.winner = None
                         tictactoe.win_line = None
                         tictactoe.animated = False
                         continue
-                    if not getattr(tictactoe, "winner", None):
+                    if not getattr(tictactoe, "winner", None) and not (ai and tictactoe.turn == 'O'):
                         board_rect = tictactoe.get_board_rect()
-                        cell_size = board_rect.width // 3
+                        cell_size = board_rect.width // tictactoe.N
                         if board_rect.collidepoint(mx, my):
                             x = (mx - board_rect.left) // cell_size
                             y = (my - board_rect.top) // cell_size
-                            if 0 <= x < 3 and 0 <= y < 3 and tictactoe.current_board[y][x] == '':
-                                tictactoe.animate_symbol(tictactoe.current_board, x, y, tictactoe.turn)
-                                tictactoe.current_board[y][x] = tictactoe.turn
-                                w, line = tictactoe.check_winner(tictactoe.current_board)
-                                if w:
-                                    tictactoe.winner = w
-                                    tictactoe.win_line = line
-                                    tictactoe.animated = False
-                                    if w == 'X':
-                                        tictactoe.score_X += 1
-                                    elif w == 'O':
-                                        tictactoe.score_O += 1
-                                elif tictactoe.is_full(tictactoe.current_board):
-                                    tictactoe.winner = 'Draw'
-                                    tictactoe.win_line = None
-                                    tictactoe.animated = False
+                            if 0 <= x < tictactoe.N and 0 <= y < tictactoe.N and tictactoe.current_board[y][x] == '':
+                                tictactoe.winner, tictactoe.win_line = tictactoe.place_symbol(tictactoe.current_board, x, y, tictactoe.turn)
+                                tictactoe.animated = False
                                 tictactoe.turn = 'O' if tictactoe.turn == 'X' else 'X'
-    tictactoe.current_board = [['' for _ in range(3)] for _ in range(3)]
+    tictactoe.current_board = tictactoe.new_board()
     tictactoe.turn = 'X'
     tictactoe.winner = None
     tictactoe.win_line = None
@@ -238,30 +272,40 @@ def run_freecell():
     import importlib
     importlib.reload(freecell)
 
-    # --- Patch: provide a present_surface callback for animation ---
-    def present_surface(surface):
-        screen.blit(surface, (0, 0))
-        pygame.display.flip()
-    freecell.present_surface = present_surface
-
-    game = freecell.PygameFreecellGame()
+    # Resume the game left running last time (it is saved after every move)
+    game = freecell.PygameFreecellGame.resume() or freecell.PygameFreecellGame()
     clock = pygame.time.Clock()
+    dt = 0.0
     running = True
     arrow_rect = None  # Store the arrow rect for click detection
     while running and game.running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                game.save()
                 pygame.quit()
                 sys.exit()
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 if arrow_rect and arrow_rect.collidepoint(event.pos):
+                    game.save()
                     return
                 game.handle_click(event.pos)
             elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r:
+                if game.deal_entry is not None:
+                    game.handle_deal_key(event)
+                elif event.key == pygame.K_r:
                     game.restart()
+                elif event.key == pygame.K_d:
+                    game.start_deal_entry()
                 elif event.key == pygame.K_p:
                     game.undo()
+                elif event.key == pygame.K_h:
+                    game.request_hint()
+                elif event.key == pygame.K_s:
+                    game.auto_solve()
+                elif event.key == pygame.K_SPACE:
+                    game.skip_animations()
+                elif event.key == pygame.K_F3:
+                    game.toggle_redraw_overlay()
                 elif event.key == pygame.K_ESCAPE:
                     running = False
                     game.running = False
@@ -271,40 +315,70 @@ def run_freecell():
                         set_display_mode(WIDTH, HEIGHT, 1)
                     else:
                         set_display_mode(WIDTH, HEIGHT, 0)
+                    game.invalidate()
             elif event.type == pygame.VIDEORESIZE:
                 WIDTH, HEIGHT = event.w, event.h
                 DISPLAY_MODE = 0
                 screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-        # --- Double buffering to prevent flicker ---
-        buffer = pygame.Surface((WIDTH, HEIGHT))
-        if game.animations:
-            # Temporarily swap the screen to buffer for drawing
-            old_screen = game.__dict__.get('screen', None)
-            game.screen = buffer
-            game.process_animations(buffer)
-            if old_screen is not None:
-                game.screen = old_screen
-            arrow_rect = draw_back_arrow_on_surface(buffer)
-        else:
-            # Temporarily swap the screen to buffer for drawing
-            old_screen = game.__dict__.get('screen', None)
-            game.screen = buffer
-            game.draw(buffer)
-            if old_screen is not None:
-                game.screen = old_screen
-            arrow_rect = draw_back_arrow_on_surface(buffer)
-        screen.blit(buffer, (0, 0))
-        pygame.display.update()
+                game.invalidate()
+            elif event.type == pygame.VIDEOEXPOSE:
+                game.invalidate()
+        # Animations advance by the time since the last frame, they never block the event loop
+        game.update(dt)
+        # Only the regions that changed are repainted and sent to the display
+        rects = game.draw(screen)
+        arrow_rect = draw_back_arrow_on_surface(screen)
+        pygame.display.update(rects + [arrow_rect])
         fps = clock.get_fps()
         pygame.display.set_caption(f'Freecell (5 Freecells) - FPS: {fps:.1f}')
-        clock.tick(60)
+        dt = clock.tick(60) / 1000
+    game.save()
     return
 
-def run_connectfour():
+def connectfour_mode_menu():
+    global WIDTH, HEIGHT, screen, DISPLAY_MODE
+    btn_two = pygame.Rect(WIDTH//2 - 150, 180, 300, 70)
+    btn_ai = pygame.Rect(WIDTH//2 - 150, 280, 300, 70)
+    btn_size = pygame.Rect(WIDTH//2 - 150, 380, 300, 70)
+    size_idx = 0
+    running = True
+    while running:
+        screen.fill(BG_COLOR)
+        title = font.render("Connect Four", True, (255,255,255))
+        screen.blit(title, (WIDTH//2 - title.get_width()//2, 60))
+        mouse = pygame.mouse.get_pos()
+        cols, rows, connect = CONNECTFOUR_SIZES[size_idx]
+        draw_button(btn_two, "2 Players", btn_two.collidepoint(mouse))
+        draw_button(btn_ai, "Vs Computer", btn_ai.collidepoint(mouse))
+        draw_button(btn_size, f"{cols}x{rows}, {connect} in a row", btn_size.collidepoint(mouse))
+        pygame.display.flip()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.VIDEORESIZE:
+                WIDTH, HEIGHT = event.w, event.h
+                DISPLAY_MODE = 0
+                screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    return
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                if btn_two.collidepoint(event.pos):
+                    run_connectfour(size=CONNECTFOUR_SIZES[size_idx])
+                    return
+                elif btn_ai.collidepoint(event.pos):
+                    run_connectfour(vs_ai=True, size=CONNECTFOUR_SIZES[size_idx])
+                    return
+                elif btn_size.collidepoint(event.pos):
+                    size_idx = (size_idx + 1) % len(CONNECTFOUR_SIZES)
+
+def run_connectfour(vs_ai=False, size=(7, 6, 4)):
     global WIDTH, HEIGHT, screen, DISPLAY_MODE
     pygame.display.set_caption("Connect Four")
     import importlib
     importlib.reload(connectfour)
+    connectfour.configure(*size)
     connectfour.WIDTH = WIDTH
     connectfour.HEIGHT = HEIGHT
     connectfour.screen = screen
@@ -318,14 +392,19 @@ def run_connectfour():
     running = True
     clock = pygame.time.Clock()
     arrow_rect = None
-    board = connectfour.create_board()
+    state = connectfour.GameState()
     selected_col = None
-    game_over = False
-    winner = None
-    turn = 1
     btn_rect = None
+    buffer = pygame.Surface((WIDTH, HEIGHT))
+    ai = connectfour.AIPlayer(connectfour.AI_TIME_BUDGET, book=connectfour.connectfour_book.load_book()) if vs_ai else None
 
     while running:
+        # Computer plays Blue: the search runs on a thread, play its move once ready
+        if ai and state.turn == 2 and not state.game_over:
+            ai.start(state.board, 2, connectfour.CONNECT)
+            col = ai.poll()
+            if col is not None:
+                connectfour.play_move(state, col, surface=buffer)
         # Handle events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -336,109 +415,19 @@ def run_connectfour():
                 if arrow_rect and arrow_rect.collidepoint(mx, my):
                     return
                 if btn_rect and btn_rect.collidepoint(mx, my):
-                    board = connectfour.create_board()
-                    game_over = False
-                    turn = 1
-                    winner = None
+                    state.reset()
+                    if ai:
+                        ai.cancel()
                     continue
-                if game_over:
+                if state.game_over or (ai and state.turn == 2):
                     continue
                 # Handle column selection
                 width, height, squaresize, radius, offset_x, offset_y = connectfour.get_sizes()
                 if offset_y <= my < offset_y + squaresize and offset_x <= mx < offset_x + squaresize*connectfour.COLS:
                     col = int((mx - offset_x) // squaresize)
-                    if 0 <= col < connectfour.COLS and connectfour.is_valid_location(board, col):
-                        row = connectfour.get_next_open_row(board, col)
-                        connectfour.animate_drop(board, col, row, turn, squaresize, radius, offset_x, offset_y)
-                        connectfour.drop_piece(board, row, col, turn)
-                        if connectfour.winning_move(board, turn):
-                            winner = turn
-                            game_over = True
-                            if turn == 1:
-                                connectfour.score_1 += 1
-                            else:
-                                connectfour.score_2 += 1
-                        elif connectfour.is_full(board):
-                            winner = None
-                            game_over = True
-                        turn = 2 if turn == 1 else 1
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_f:
-                    # Toggle fullscreen
-                    if DISPLAY_MODE == 0:
-                        set_display_mode(WIDTH, HEIGHT, 1)
-                    else:
-                        set_display_mode(WIDTH, HEIGHT, 0)
-                elif event.key == pygame.K_ESCAPE:
-                    running = False
-            elif event.type == pygame.VIDEORESIZE:
-                WIDTH, HEIGHT = event.w, event.h
-                DISPLAY_MODE = 0
-                screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-                connectfour.WIDTH = WIDTH
-                connectfour.HEIGHT = HEIGHT
-                connectfour.screen = screen
-
-            elif event.type == pygame.MOUSEMOTION:
-                mx, my = event.pos
-                width, height, squaresize, radius, offset_x, offset_y = connectfour.get_sizes()
-                if offset_y <= my < offset_y + squaresize and offset_x <= mx < offset_x + squaresize*connectfour.COLS:
-                    selected_col = int((mx - offset_x) // squaresize)
-                else:
-                    selected_col = None
-
-        # --- Double buffering to prevent flicker and draw arrow ---
-        buffer = pygame.Surface((WIDTH, HEIGHT))
-        connectfour.screen = buffer
-        btn_rect = connectfour.draw_board(board, selected_col, surface=buffer)
-        # Draw the back arrow on the buffer
-        arrow_rect = draw_back_arrow_on_surface(buffer)
-        # Draw winner/game over message if needed
-        width, height, squaresize, radius, offset_x, offset_y = connectfour.get_sizes()
-        if game_over:
-            msg = f"{'Rouge' if winner == 1 else 'Bleu'} gagne !" if winner else "Match nul !"
-            text = connectfour.small_font.render(msg, True, (0, 128, 0))
-            buffer.blit(text, (offset_x + squaresize*connectfour.COLS//2 - text.get_width()//2, offset_y + squaresize - text.get_height() - 10))
-        screen.blit(buffer, (0, 0))
-        pygame.display.flip()
-        clock.tick(60)
-
-        # --- Handle animation on click ---
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                mx, my = event.pos
-                if arrow_rect and arrow_rect.collidepoint(mx, my):
-                    return
-                if btn_rect and btn_rect.collidepoint(mx, my):
-                    board = connectfour.create_board()
-                    game_over = False
-                    turn = 1
-                    winner = None
-                    continue
-                if game_over:
-                    continue
-                width, height, squaresize, radius, offset_x, offset_y = connectfour.get_sizes()
-                if offset_y <= my < offset_y + squaresize and offset_x <= mx < offset_x + squaresize*connectfour.COLS:
-                    col = int((mx - offset_x) // squaresize)
-                    if 0 <= col < connectfour.COLS and connectfour.is_valid_location(board, col):
-                        row = connectfour.get_next_open_row(board, col)
+                    if state.can_play(col):
                         # Pass buffer as surface for animation
-                        connectfour.animate_drop(board, col, row, turn, squaresize, radius, offset_x, offset_y, surface=buffer)
-                        connectfour.drop_piece(board, row, col, turn)
-                        if connectfour.winning_move(board, turn):
-                            winner = turn
-                            game_over = True
-                            if turn == 1:
-                                connectfour.score_1 += 1
-                            else:
-                                connectfour.score_2 += 1
-                        elif connectfour.is_full(board):
-                            winner = None
-                            game_over = True
-                        turn = 2 if turn == 1 else 1
+                        connectfour.play_move(state, col, squaresize, radius, offset_x, offset_y, surface=buffer)
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_f:
                     # Toggle fullscreen
@@ -448,6 +437,16 @@ def run_connectfour():
                         set_display_mode(WIDTH, HEIGHT, 0)
                 elif event.key == pygame.K_ESCAPE:
                     running = False
+                elif event.key in (pygame.K_p, pygame.K_n):
+                    # P: undo, N: redo
+                    if ai:
+                        ai.cancel()
+                    if event.key == pygame.K_p:
+                        connectfour.undo_move(state, vs_ai)
+                    else:
+                        connectfour.redo_move(state, vs_ai)
+                elif event.key == pygame.K_e:
+                    connectfour.export_replay(state)
             elif event.type == pygame.VIDEORESIZE:
                 WIDTH, HEIGHT = event.w, event.h
                 DISPLAY_MODE = 0
@@ -455,6 +454,7 @@ def run_connectfour():
                 connectfour.WIDTH = WIDTH
                 connectfour.HEIGHT = HEIGHT
                 connectfour.screen = screen
+                connectfour.invalidate_board_layer()
 
             elif event.type == pygame.MOUSEMOTION:
                 mx, my = event.pos
@@ -465,15 +465,16 @@ def run_connectfour():
                     selected_col = None
 
         # --- Double buffering to prevent flicker and draw arrow ---
-        buffer = pygame.Surface((WIDTH, HEIGHT))
+        if buffer.get_size() != (WIDTH, HEIGHT):
+            buffer = pygame.Surface((WIDTH, HEIGHT))
         connectfour.screen = buffer
-        btn_rect = connectfour.draw_board(board, selected_col, surface=buffer)
+        btn_rect = connectfour.draw_board(state, selected_col, surface=buffer)
         # Draw the back arrow on the buffer
         arrow_rect = draw_back_arrow_on_surface(buffer)
         # Draw winner/game over message if needed
         width, height, squaresize, radius, offset_x, offset_y = connectfour.get_sizes()
-        if game_over:
-            msg = f"{'Rouge' if winner == 1 else 'Bleu'} gagne !" if winner else "Match nul !"
+        if state.game_over:
+            msg = f"{'Rouge' if state.winner == 1 else 'Bleu'} gagne !" if state.winner else "Match nul !"
             text = connectfour.small_font.render(msg, True, (0, 128, 0))
             buffer.blit(text, (offset_x + squaresize*connectfour.COLS//2 - text.get_width()//2, offset_y + squaresize - text.get_height() - 10))
         screen.blit(buffer, (0, 0))
@@ -0,0 +1,65 @@
+import random
+
+import connectfour_engine as engine
+
+
+def play(moves):
+    board = engine.create_board()
+    for i, col in enumerate(moves):
+        board.play(col, 1 + i % 2)
+    return board
+
+def test_root_move_after_table_hit():
+    # The searches on the earlier positions leave this one in the table as a forced win: the
+    # root must still pick the winning column 2, not fall back to the centre
+    moves = [0, 3, 4, 3, 3, 4, 3, 3, 5, 5, 5, 4, 4, 5, 5]
+    searcher = engine.Searcher()
+    for n in range(1, len(moves), 2):
+        searcher.best_move(play(moves[:n]), 2, time_budget=0, max_depth=6)
+    assert searcher.best_move(play(moves), 2, time_budget=0, max_depth=6) == 2
+    assert searcher.root_move == 2
+
+def lines(cols, rows, k):
+    # Every line of k cells as (row, col) lists, row 0 at the top
+    for r in range(rows):
+        for c in range(cols):
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                cells = [(r + dr * i, c + dc * i) for i in range(k)]
+                if all(0 <= rr < rows and 0 <= cc < cols for rr, cc in cells):
+                    yield cells
+
+def random_board(rng, cols, rows, k):
+    board = engine.create_board(cols, rows, k)
+    for i in range(rng.randrange(cols * rows + 1)):
+        board.play(rng.choice([c for c in range(cols) if board.can_play(c)]), 1 + i % 2)
+    return board
+
+def test_bitboard_against_line_scan():
+    rng = random.Random(1)
+    for cols, rows, k in ((7, 6, 4), (9, 7, 5)):
+        all_lines = list(lines(cols, rows, k))
+        for _ in range(300):
+            board = random_board(rng, cols, rows, k)
+            grid = list(board)
+            for piece in (1, 2):
+                win = any(all(grid[r][c] == piece for r, c in cells) for cells in all_lines)
+                assert board.is_win(piece) == win
+                threats = set()
+                for cells in all_lines:
+                    values = [grid[r][c] for r, c in cells]
+                    if values.count(piece) == k - 1 and values.count(0) == 1:
+                        threats.add(cells[values.index(0)])
+                found = {(r, c) for r in range(rows) for c in range(cols)
+                         if board.threats(piece) >> (c * board.h + rows - 1 - r) & 1}
+                assert found == threats
+
+def test_drop_piece_checks_the_row():
+    board = engine.create_board()
+    engine.drop_piece(board, engine.ROWS - 1, 3, 1)
+    try:
+        engine.drop_piece(board, engine.ROWS - 1, 3, 2)
+    except AssertionError:
+        pass
+    else:
+        assert False, 'a stale row was accepted'
+    assert board[engine.ROWS - 2][3] == 0
@@ -0,0 +1,77 @@
+import random
+
+import freecell
+
+
+def test_apply_and_revert_round_trip():
+    rng = random.Random(0)
+    state = freecell.deal(1, ms=True)
+    for _ in range(200):
+        moves = freecell.legal_moves(state)
+        if not moves:
+            break
+        before, before_key = state.key(), freecell.canonical_key(state)
+        for move in moves:
+            state.apply(move)
+            state.revert(move)
+            assert state.key() == before and freecell.canonical_key(state) == before_key
+        state.apply(rng.choice(moves))
+
+def test_undo_groups():
+    game = freecell.FreecellGame(1, ms=True)
+    start = game.state.key()
+    game.begin_undo_group()
+    game.do_move((2, 8, 1))
+    game.do_move((2, 1, 1))
+    middle = game.state.key()
+    game.begin_undo_group()
+    game.do_move((3, 9, 1))
+    assert game.undo() and game.state.key() == middle
+    assert game.undo() and game.state.key() == start
+    assert not game.undo()
+
+def test_legal_moves_ms_deal_1():
+    state = freecell.deal(1, ms=True)
+    # No ace on top and no top card fits on another: only the first free cell (slot 8)
+    assert sorted(freecell.legal_moves(state)) == [(col, 8, 1) for col in range(8)]
+
+    # 2H to a cell, 8D onto 9C (column 1 ends 9C 8D), 6H and QS to cells to uncover 10H
+    for move in ((2, 8, 1), (2, 1, 1), (3, 9, 1), (3, 10, 1)):
+        state.apply(move)
+    # Two free cells, no empty column: (2 + 1) << 0 = 3 cards may move, so 9C 8D goes onto 10H;
+    # 3D onto 4S, and any top card to the first free cell (slot 11)
+    assert sorted(freecell.legal_moves(state)) == sorted([(1, 3, 2), (5, 2, 1)] + [(col, 11, 1) for col in range(8)])
+
+    # With the last two cells filled only (0 + 1) << 0 = 1 card moves at a time
+    state.apply((4, 11, 1))
+    state.apply((6, 12, 1))
+    assert freecell.max_move(0, 0) == 1
+    moves = freecell.legal_moves(state)
+    assert (1, 3, 2) not in moves and (1, 3, 1) not in moves
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'save.bin')
+    rng = random.Random(1)
+    game = freecell.FreecellGame(1, ms=True)
+    for i in range(30):
+        if i % 4 == 0:
+            game.begin_undo_group()
+        game.do_move(rng.choice(freecell.legal_moves(game.state)))
+    game.elapsed = 12.5
+    freecell.save_session(game, path)
+    assert freecell.load_session(path) == (1, True, 12.5, game.undo_stack)
+    resumed = freecell.FreecellGame.resume(path)
+    assert resumed.state.key() == game.state.key()
+    assert resumed.undo_stack == game.undo_stack
+    while resumed.undo():
+        pass
+    assert resumed.state.key() == freecell.deal(1, ms=True).key()
+
+def test_solve_ms_deal_1():
+    moves, _ = freecell.solve(freecell.deal(1, ms=True))
+    assert moves
+    state = freecell.deal(1, ms=True)
+    for move in moves:
+        assert move in freecell.legal_moves(state)
+        state.apply(move)
+    assert state.foundations == [13, 13, 13, 13]
@@ -1,6 +1,7 @@
 import pygame
 import sys
 import math
+from tictactoe_engine import Board, make_player
 
 # Constants
 WIDTH, HEIGHT = 400, 400
@@ -9,7 +10,8 @@ BG_COLOR = (230, 240, 230)
 X_COLOR = (220, 60, 60)
 O_COLOR = (60, 120, 220)
 LINE_WIDTH = 6
-CELL_SIZE = WIDTH // 3
+N, K = 3, 3  # board size and symbols in a row to win (e.g. 15, 5 for gomoku)
+CELL_SIZE = WIDTH // N
 ANIM_FRAMES = 18
 
 pygame.init()
@@ -17,55 +19,118 @@ screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
 pygame.display.set_caption("Tic-Tac-Toe")
 font = pygame.font.SysFont('arial', 80, bold=True)
 small_font = pygame.font.SysFont('arial', 32, bold=True)
+# Fonts are created once, SysFont is far too slow to call every frame
+score_font = pygame.font.SysFont('arial', 32, bold=True)
+btn_font = pygame.font.SysFont('arial', 26, bold=True)
+
+# Pre-rendered surfaces: background + grid per window/board size, X and O per cell size,
+# score texts and the restart button. An animation frame is then a handful of blits.
+board_layer = None
+board_layer_key = None
+sprites = {}
+score_texts = {}
+restart_sprite = None
 
 # Global scores
 score_X = 0
 score_O = 0
 
+def configure(n=3, k=3):
+    global N, K
+    N, K = n, k
+
+def new_board():
+    return Board(N, K)
+
 def get_board_rect():
     # Compute the centered square area for the board
     min_dim = min(WIDTH, HEIGHT) * 0.85
-    size = int(min_dim // 3 * 3)  # multiple of 3
+    size = int(min_dim // N * N)  # multiple of N
     x = (WIDTH - size) // 2
     y = (HEIGHT - size) // 2
     return pygame.Rect(x, y, size, size)
 
-def draw_board(board):
-    screen.fill(BG_COLOR)
-    board_rect = get_board_rect()
-    cell_size = board_rect.width // 3
+def clear_caches():
+    global board_layer, board_layer_key, restart_sprite
+    board_layer = None
+    board_layer_key = None
+    restart_sprite = None
+    sprites.clear()
+    score_texts.clear()
 
-    # Draw the board area with rounded corners
-    pygame.draw.rect(screen, (255, 255, 255), board_rect, border_radius=32)
-    pygame.draw.rect(screen, (200, 210, 200), board_rect, width=6, border_radius=32)
+def get_board_layer():
+    # Background, board area and grid lines, rebuilt only when the window or board size changes
+    global board_layer, board_layer_key
+    key = (WIDTH, HEIGHT, N)
+    if board_layer is None or board_layer_key != key:
+        board_rect = get_board_rect()
+        cell_size = board_rect.width // N
+        board_layer = pygame.Surface((WIDTH, HEIGHT)).convert()
+        board_layer.fill(BG_COLOR)
 
-    # Draw grid lines
-    for i in range(1, 3):
-        # Horizontal lines
-        start = (board_rect.left, board_rect.top + i * cell_size)
-        end = (board_rect.right, board_rect.top + i * cell_size)
-        pygame.draw.line(screen, LINE_COLOR, start, end, LINE_WIDTH)
-        # Vertical lines
-        start = (board_rect.left + i * cell_size, board_rect.top)
-        end = (board_rect.left + i * cell_size, board_rect.bottom)
-        pygame.draw.line(screen, LINE_COLOR, start, end, LINE_WIDTH)
+        # Draw the board area with rounded corners
+        pygame.draw.rect(board_layer, (255, 255, 255), board_rect, border_radius=32)
+        pygame.draw.rect(board_layer, (200, 210, 200), board_rect, width=6, border_radius=32)
+
+        # Draw grid lines
+        line_width = min(LINE_WIDTH, max(1, cell_size // 16))
+        for i in range(1, N):
+            # Horizontal lines
+            start = (board_rect.left, board_rect.top + i * cell_size)
+            end = (board_rect.right, board_rect.top + i * cell_size)
+            pygame.draw.line(board_layer, LINE_COLOR, start, end, line_width)
+            # Vertical lines
+            start = (board_rect.left + i * cell_size, board_rect.top)
+            end = (board_rect.left + i * cell_size, board_rect.bottom)
+            pygame.draw.line(board_layer, LINE_COLOR, start, end, line_width)
+        board_layer_key = key
+    return board_layer
+
+def get_sprite(symbol, cell_size):
+    # Finished X or O for one cell, transparent around the symbol
+    key = (symbol, cell_size)
+    if key not in sprites:
+        if len(sprites) > 16:
+            sprites.clear()  # old cell sizes after a lot of resizing
+        sprite = pygame.Surface((cell_size, cell_size), pygame.SRCALPHA)
+        draw = draw_cross if symbol == 'X' else draw_circle
+        draw(0, 0, 1.0, sprite.get_rect(), cell_size, surface=sprite)
+        sprites[key] = sprite
+    return sprites[key]
+
+def draw_board(board):
+    board_rect = get_board_rect()
+    cell_size = board_rect.width // N
+    screen.blit(get_board_layer(), (0, 0))
 
     # Draw X and O
-    for y in range(3):
-        for x in range(3):
-            if board[y][x] == 'X':
-                draw_cross(x, y, 1.0, board_rect, cell_size)
-            elif board[y][x] == 'O':
-                draw_circle(x, y, 1.0, board_rect, cell_size)
+    sprite_x = get_sprite('X', cell_size)
+    sprite_o = get_sprite('O', cell_size)
+    for y in range(N):
+        row = board[y]
+        for x in range(N):
+            if row[x] == 'X':
+                screen.blit(sprite_x, (board_rect.left + x * cell_size, board_rect.top + y * cell_size))
+            elif row[x] == 'O':
+                screen.blit(sprite_o, (board_rect.left + x * cell_size, board_rect.top + y * cell_size))
 
-def draw_cross(cell_x, cell_y, progress=1.0, board_rect=None, cell_size=None):
+def draw_frame(board):
+    # Everything but the animated part: board, symbols, scores and restart button
+    draw_board(board)
+    draw_scores()
+    return draw_restart_button()
+
+def draw_cross(cell_x, cell_y, progress=1.0, board_rect=None, cell_size=None, surface=None):
     # Draw an animated cross in cell (cell_x, cell_y)
+    if surface is None:
+        surface = screen
     if board_rect is None or cell_size is None:
         board_rect = get_board_rect()
-        cell_size = board_rect.width // 3
+        cell_size = board_rect.width // N
     cx = board_rect.left + cell_x * cell_size + cell_size // 2
     cy = board_rect.top + cell_y * cell_size + cell_size // 2
-    size = cell_size // 2 - 18
+    size = cell_size // 2 - min(18, cell_size // 6)
+    width = min(10, max(2, cell_size // 10))
     # Two lines: from top-left to bottom-right, and top-right to bottom-left
     for i in range(2):
         angle1 = math.pi/4 if i == 0 else 3*math.pi/4
@@ -77,52 +142,39 @@ def draw_cross(cell_x, cell_y, progress=1.0, board_rect=None, cell_size=None):
         # Animate line drawing
         x_end = x1 + (x2 - x1) * progress
         y_end = y1 + (y2 - y1) * progress
-        pygame.draw.line(screen, X_COLOR, (x1, y1), (x_end, y_end), 10)
+        pygame.draw.line(surface, X_COLOR, (x1, y1), (x_end, y_end), width)
         # Only draw the moving endpoint for animation, not both ends
         if progress < 1.0:
-            pygame.draw.circle(screen, X_COLOR, (int(x_end), int(y_end)), 5)
+            pygame.draw.circle(surface, X_COLOR, (int(x_end), int(y_end)), width // 2)
         # Do not draw static endpoints
 
-def draw_circle(cell_x, cell_y, progress=1.0, board_rect=None, cell_size=None):
+def draw_circle(cell_x, cell_y, progress=1.0, board_rect=None, cell_size=None, surface=None):
     # Draw an animated circle in cell (cell_x, cell_y)
+    if surface is None:
+        surface = screen
     if board_rect is None or cell_size is None:
         board_rect = get_board_rect()
-        cell_size = board_rect.width // 3
+        cell_size = board_rect.width // N
     cx = board_rect.left + cell_x * cell_size + cell_size // 2
     cy = board_rect.top + cell_y * cell_size + cell_size // 2
-    radius = cell_size // 2 - 18
+    radius = cell_size // 2 - min(18, cell_size // 6)
+    width = min(10, max(2, cell_size // 10))
     start_angle = -math.pi / 2
     end_angle = start_angle + 2 * math.pi * progress
     rect = pygame.Rect(cx - radius, cy - radius, 2 * radius, 2 * radius)
     # Draw arc for animation
-    pygame.draw.arc(screen, O_COLOR, rect, start_angle, end_angle, 10)
+    pygame.draw.arc(surface, O_COLOR, rect, start_angle, end_angle, width)
     # Only draw the moving endpoint for animation, not both ends
     if progress < 1.0 and progress > 0.01:
         x_end = cx + radius * math.cos(end_angle)
         y_end = cy + radius * math.sin(end_angle)
-        pygame.draw.circle(screen, O_COLOR, (int(x_end), int(y_end)), 5)
+        pygame.draw.circle(surface, O_COLOR, (int(x_end), int(y_end)), width // 2)
     # Do not draw static start point
 
-def check_winner(board):
-    # Rows, columns, diagonals
-    for i in range(3):
-        if board[i][0] == board[i][1] == board[i][2] != '':
-            return board[i][0], ((0, i), (2, i))
-        if board[0][i] == board[1][i] == board[2][i] != '':
-            return board[0][i], ((i, 0), (i, 2))
-    if board[0][0] == board[1][1] == board[2][2] != '':
-        return board[0][0], ((0, 0), (2, 2))
-    if board[0][2] == board[1][1] == board[2][0] != '':
-        return board[0][2], ((2, 0), (0, 2))
-    return None, None
-
-def is_full(board):
-    return all(board[y][x] != '' for y in range(3) for x in range(3))
-
 def animate_win_line(start_cell, end_cell, persist=False):
     # Animate a line from start_cell to end_cell (cell coordinates)
     board_rect = get_board_rect()
-    cell_size = board_rect.width // 3
+    cell_size = board_rect.width // N
     start_px = (board_rect.left + start_cell[0] * cell_size + cell_size // 2,
                 board_rect.top + start_cell[1] * cell_size + cell_size // 2)
     end_px = (board_rect.left + end_cell[0] * cell_size + cell_size // 2,
@@ -130,71 +182,104 @@ def animate_win_line(start_cell, end_cell, persist=False):
     duration = 0.5  # seconds
     fps = 60
     frames = int(duration * fps)
+    # The board does not change during the animation, render it once
+    draw_frame(current_board)
+    background = screen.copy()
+    clock = pygame.time.Clock()
     for i in range(1, frames + 1):
         t = i / frames
         x = int(start_px[0] + (end_px[0] - start_px[0]) * t)
         y = int(start_px[1] + (end_px[1] - start_px[1]) * t)
-        draw_board(current_board)
-        draw_scores()
-        draw_restart_button()
-        pygame.draw.line(screen, (0, 180, 0), start_px, (x, y), 10)
+        screen.blit(background, (0, 0))
+        pygame.draw.line(screen, (0, 180, 0), start_px, (x, y), min(10, max(3, cell_size // 10)))
         pygame.display.flip()
-        pygame.time.Clock().tick(fps)
+        clock.tick(fps)
     if persist:
-        draw_board(current_board)
-        draw_scores()
-        draw_restart_button()
-        pygame.draw.line(screen, (0, 180, 0), start_px, end_px, 10)
+        screen.blit(background, (0, 0))
+        pygame.draw.line(screen, (0, 180, 0), start_px, end_px, min(10, max(3, cell_size // 10)))
         pygame.display.flip()
 
+def place_symbol(board, cell_x, cell_y, symbol):
+    # Animate and place a symbol, update scores; returns (winner, win_line)
+    global score_X, score_O
+    animate_symbol(board, cell_x, cell_y, symbol)
+    w, line = board.place(cell_x, cell_y, symbol)
+    if w:
+        if w == 'X':
+            score_X += 1
+        elif w == 'O':
+            score_O += 1
+        return w, line
+    if board.is_full():
+        return 'Draw', None
+    return None, None
+
 def animate_symbol(board, cell_x, cell_y, symbol):
     board_rect = get_board_rect()
-    cell_size = board_rect.width // 3
+    cell_size = board_rect.width // N
+    draw_frame(board)
+    background = screen.copy()
+    clock = pygame.time.Clock()
     for frame in range(1, ANIM_FRAMES + 1):
         progress = frame / ANIM_FRAMES
-        draw_board(board)
-        draw_scores()
-        draw_restart_button()
+        screen.blit(background, (0, 0))
         if symbol == 'X':
             draw_cross(cell_x, cell_y, progress, board_rect, cell_size)
         elif symbol == 'O':
             draw_circle(cell_x, cell_y, progress, board_rect, cell_size)
         pygame.display.flip()
-        pygame.time.Clock().tick(60)
+        clock.tick(60)
 
 def draw_restart_button():
     # Draw a "Restart" button at the bottom right
-    btn_font = pygame.font.SysFont('arial', 26, bold=True)
-    text = btn_font.render("Recommencer", True, (255,255,255))
+    global restart_sprite
+    if restart_sprite is None:
+        text = btn_font.render("Recommencer", True, (255,255,255))
+        btn_w, btn_h = text.get_width() + 32, text.get_height() + 16
+        restart_sprite = pygame.Surface((btn_w, btn_h), pygame.SRCALPHA)
+        rect = restart_sprite.get_rect()
+        pygame.draw.rect(restart_sprite, (60, 120, 220), rect, border_radius=16)
+        pygame.draw.rect(restart_sprite, (30, 70, 160), rect, width=3, border_radius=16)
+        restart_sprite.blit(text, (16, 8))
     padding = 18
-    btn_w, btn_h = text.get_width() + 32, text.get_height() + 16
+    btn_w, btn_h = restart_sprite.get_size()
     rect = pygame.Rect(WIDTH - btn_w - padding, HEIGHT - btn_h - padding, btn_w, btn_h)
-    pygame.draw.rect(screen, (60, 120, 220), rect, border_radius=16)
-    pygame.draw.rect(screen, (30, 70, 160), rect, width=3, border_radius=16)
-    screen.blit(text, (rect.x + 16, rect.y + 8))
+    screen.blit(restart_sprite, rect)
     return rect
 
+def score_text(symbol, score, color):
+    key = (symbol, score)
+    if key not in score_texts:
+        score_texts[key] = score_font.render(f"{symbol} : {score}", True, color)
+    return score_texts[key]
+
 def draw_scores():
     # Display X (red) and O (blue) scores at the top
-    score_font = pygame.font.SysFont('arial', 32, bold=True)
-    x_text = score_font.render(f"X : {score_X}", True, X_COLOR)
-    o_text = score_font.render(f"O : {score_O}", True, O_COLOR)
+    x_text = score_text('X', score_X, X_COLOR)
+    o_text = score_text('O', score_O, O_COLOR)
     screen.blit(x_text, (32, 18))
     screen.blit(o_text, (WIDTH - o_text.get_width() - 32, 18))
 
-def main():
+def main(vs_ai=False, n=3, k=3):
     global current_board, score_X, score_O
-    board = [['' for _ in range(3)] for _ in range(3)]
+    configure(n, k)
+    board = new_board()
     current_board = board
     turn = 'X'
     running = True
     winner = None
     win_line = None
     animated = False
+    ai = make_player(N, K) if vs_ai else None  # the computer plays O
 
     global WIDTH, HEIGHT, screen
 
     while running:
+        if ai and turn == 'O' and not winner:
+            x, y = ai.best_move(board, turn)
+            winner, win_line = place_symbol(board, x, y, turn)
+            animated = False
+            turn = 'X'
         draw_board(board)
         draw_scores()
         btn_rect = draw_restart_button()
@@ -205,13 +290,13 @@ def main():
             elif win_line and animated:
                 # Always redraw the win line after animation
                 board_rect = get_board_rect()
-                cell_size = board_rect.width // 3
+                cell_size = board_rect.width // N
                 start_cell, end_cell = win_line
                 start_px = (board_rect.left + start_cell[0] * cell_size + cell_size // 2,
                             board_rect.top + start_cell[1] * cell_size + cell_size // 2)
                 end_px = (board_rect.left + end_cell[0] * cell_size + cell_size // 2,
                           board_rect.top + end_cell[1] * cell_size + cell_size // 2)
-                pygame.draw.line(screen, (0, 180, 0), start_px, end_px, 10)
+                pygame.draw.line(screen, (0, 180, 0), start_px, end_px, min(10, max(3, cell_size // 10)))
             msg = f"{winner} gagne !" if winner in ['X', 'O'] else "Match nul !"
             text = small_font.render(msg, True, (0, 128, 0))
             screen.blit(text, (WIDTH//2 - text.get_width()//2, HEIGHT//2 - text.get_height()//2))
@@ -225,7 +310,7 @@ def main():
                 screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
             elif event.type == pygame.KEYDOWN and winner:
                 if event.key == pygame.K_r:
-                    board = [['' for _ in range(3)] for _ in range(3)]
+                    board = new_board()
                     current_board = board
                     turn = 'X'
                     winner = None
@@ -234,39 +319,32 @@ def main():
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 mx, my = event.pos
                 if btn_rect.collidepoint(mx, my):
-                    board = [['' for _ in range(3)] for _ in range(3)]
+                    board = new_board()
                     current_board = board
                     turn = 'X'
                     winner = None
                     win_line = None
                     animated = False
                     continue
-                if not winner:
+                if not winner and not (ai and turn == 'O'):
                     board_rect = get_board_rect()
-                    cell_size = board_rect.width // 3
+                    cell_size = board_rect.width // N
                     # Check if click is inside the board
                     if board_rect.collidepoint(mx, my):
                         x = (mx - board_rect.left) // cell_size
                         y = (my - board_rect.top) // cell_size
-                        if 0 <= x < 3 and 0 <= y < 3 and board[y][x] == '':
-                            animate_symbol(board, x, y, turn)
-                            board[y][x] = turn
-                            w, line = check_winner(board)
-                            if w:
-                                winner = w
-                                win_line = line
-                                animated = False
-                                if w == 'X':
-                                    score_X += 1
-                                elif w == 'O':
-                                    score_O += 1
-                            elif is_full(board):
-                                winner = 'Draw'
-                                win_line = None
-                                animated = False
+                        if 0 <= x < N and 0 <= y < N and board[y][x] == '':
+                            winner, win_line = place_symbol(board, x, y, turn)
+                            animated = False
                             turn = 'O' if turn == 'X' else 'X'
     pygame.quit()
     sys.exit()
 
 if __name__ == '__main__':
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description='Tic-Tac-Toe')
+    parser.add_argument('--ai', action='store_true', help='play against the computer')
+    parser.add_argument('--size', type=int, default=3, help='board is size x size')
+    parser.add_argument('--k', type=int, default=3, help='symbols in a row needed to win')
+    args = parser.parse_args()
+    main(vs_ai=args.ai, n=args.size, k=args.k)
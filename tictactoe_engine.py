@@ -0,0 +1,312 @@
+# Tic-Tac-Toe engine.
+# On 3x3, every reachable position, reduced by the 8 board symmetries (765 positions), is solved once
+# with minimax and cached on disk as 4-byte records, so the computer answers instantly.
+# Larger N x N boards with K in a row (e.g. 15x15 gomoku) use Board and ThreatSpacePlayer below.
+import os
+import struct
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tictactoe_table.bin')
+MAGIC = b'TTT1'
+RECORD = struct.Struct('<HbB')  # base-3 position code, value for the side to move, best cell (255: none)
+
+LINES = [(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6)]
+
+def _symmetries():
+    # Cell permutations for the 4 rotations and their mirror images; perm[i] is the source cell
+    perms = []
+    cells = list(range(9))
+    for _ in range(4):
+        cells = [cells[6 - 3 * (i % 3) + i // 3] for i in range(9)]  # rotate 90 degrees
+        perms.append(cells)
+        perms.append([cells[3 * (i // 3) + 2 - i % 3] for i in range(9)])  # mirror
+    return perms
+
+SYMMETRIES = _symmetries()
+
+
+def encode(cells):
+    # cells: 9 values, 0 empty, 1 X, 2 O
+    code = 0
+    for v in reversed(cells):
+        code = code * 3 + v
+    return code
+
+def winner(cells):
+    for a, b, c in LINES:
+        if cells[a] and cells[a] == cells[b] == cells[c]:
+            return cells[a]
+    return 0
+
+def canonical(cells):
+    # Returns (code, perm) for the smallest symmetric image of the position
+    return min((encode([cells[p] for p in perm]), perm) for perm in SYMMETRIES)
+
+
+def solve():
+    # Minimax over all reachable positions, keyed by canonical code
+    table = {}
+
+    def search(cells, player):
+        code, perm = canonical(cells)
+        if code in table:
+            return table[code][0]
+        if winner(cells):
+            value, move = -1, None  # the previous player just won
+        elif all(cells):
+            value, move = 0, None
+        else:
+            value, move = -2, None
+            for i in range(9):
+                if cells[i]:
+                    continue
+                cells[i] = player
+                score = -search(cells, 3 - player)
+                cells[i] = 0
+                if score > value:
+                    value, move = score, i
+            # Store the move in canonical orientation
+            move = perm.index(move)
+        table[code] = (value, move)
+        return value
+
+    search([0] * 9, 1)
+    return table
+
+def save_table(table, path=TABLE_PATH):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        for code in sorted(table):
+            value, move = table[code]
+            f.write(RECORD.pack(code, value, 255 if move is None else move))
+    os.replace(tmp, path)
+
+def load_table(path=TABLE_PATH):
+    # Read the cached table, building (and caching) it the first time
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:4] == MAGIC and (len(data) - 4) % RECORD.size == 0:
+            table = {}
+            for code, value, move in RECORD.iter_unpack(data[4:]):
+                table[code] = (value, None if move == 255 else move)
+            return table
+    except OSError:
+        pass
+    table = solve()
+    try:
+        save_table(table, path)
+    except OSError:
+        pass
+    return table
+
+
+class PerfectPlayer:
+    def __init__(self, path=TABLE_PATH):
+        self.table = load_table(path)
+
+    def best_move(self, board, symbol=None):
+        # board: 3x3 list of '', 'X', 'O'; returns (x, y) of the best cell for the side to move
+        cells = [{'': 0, 'X': 1, 'O': 2}[board[i // 3][i % 3]] for i in range(9)]
+        code, perm = canonical(cells)
+        entry = self.table.get(code)
+        if entry is None or entry[1] is None:
+            return None
+        cell = perm[entry[1]]
+        return cell % 3, cell // 3
+
+
+# --- N x N boards, K in a row ---
+
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+
+class Board:
+    # N x N board of '', 'X', 'O', indexed board[y][x] like the original list of lists.
+    # Wins are only ever looked for along the lines through the last move.
+    def __init__(self, n=3, k=3):
+        self.n = n
+        self.k = k
+        self.rows = [['' for _ in range(n)] for _ in range(n)]
+        self.count = 0
+        self.history = []  # (x, y) of every move, for undo
+
+    def __getitem__(self, y):
+        return self.rows[y]
+
+    def __len__(self):
+        return self.n
+
+    def is_full(self):
+        return self.count == self.n * self.n
+
+    def place(self, x, y, symbol):
+        # Returns (winner, ((x0, y0), (x1, y1))) for a winning move, (None, None) otherwise
+        self.rows[y][x] = symbol
+        self.count += 1
+        self.history.append((x, y))
+        return self.winner_at(x, y)
+
+    def undo(self):
+        x, y = self.history.pop()
+        self.rows[y][x] = ''
+        self.count -= 1
+        return x, y
+
+    def run(self, x, y, dx, dy, symbol):
+        # Ends of the run of `symbol` through (x, y) along (dx, dy), counting (x, y) as ours
+        n, rows = self.n, self.rows
+        x0, y0 = x, y
+        while 0 <= x0 - dx < n and 0 <= y0 - dy < n and rows[y0 - dy][x0 - dx] == symbol:
+            x0, y0 = x0 - dx, y0 - dy
+        x1, y1 = x, y
+        while 0 <= x1 + dx < n and 0 <= y1 + dy < n and rows[y1 + dy][x1 + dx] == symbol:
+            x1, y1 = x1 + dx, y1 + dy
+        return (x0, y0), (x1, y1)
+
+    def winner_at(self, x, y):
+        symbol = self.rows[y][x]
+        for dx, dy in DIRECTIONS:
+            start, end = self.run(x, y, dx, dy, symbol)
+            if max(abs(end[0] - start[0]), abs(end[1] - start[1])) + 1 >= self.k:
+                return symbol, (start, end)
+        return None, None
+
+    def is_winning_cell(self, x, y, symbol):
+        # Would playing symbol on the empty cell (x, y) complete a line?
+        for dx, dy in DIRECTIONS:
+            start, end = self.run(x, y, dx, dy, symbol)
+            if max(abs(end[0] - start[0]), abs(end[1] - start[1])) + 1 >= self.k:
+                return True
+        return False
+
+    def winning_cells_near(self, x, y, symbol):
+        # Empty cells on the lines through (x, y) that would complete a line for symbol
+        cells = set()
+        n, rows = self.n, self.rows
+        for dx, dy in DIRECTIONS:
+            for step in range(-self.k + 1, self.k):
+                cx, cy = x + dx * step, y + dy * step
+                if 0 <= cx < n and 0 <= cy < n and rows[cy][cx] == '' and self.is_winning_cell(cx, cy, symbol):
+                    cells.add((cx, cy))
+        return cells
+
+
+def other(symbol):
+    return 'O' if symbol == 'X' else 'X'
+
+
+class ThreatSpacePlayer:
+    # Search for larger boards. Only forcing moves are searched (threat-space pruning): the attacker
+    # plays moves that threaten to win next turn, the defender's only replies are the blocks.
+    # Two threats at once, or a threat whose block loses anyway, wins the game.
+    def __init__(self, max_depth=8, max_nodes=20000):
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.nodes = 0
+
+    def stones(self, board, symbol):
+        return [(x, y) for x, y in board.history if board.rows[y][x] == symbol]
+
+    def threat_moves(self, board, symbol):
+        # Empty cells lying in a K-window that holds K-2 of our stones and nothing of the opponent
+        k, n, rows = board.k, board.n, board.rows
+        moves = set()
+        for sx, sy in self.stones(board, symbol):
+            for dx, dy in DIRECTIONS:
+                for offset in range(k):
+                    x0, y0 = sx - dx * offset, sy - dy * offset
+                    x1, y1 = x0 + dx * (k - 1), y0 + dy * (k - 1)
+                    if not (0 <= x0 < n and 0 <= y0 < n and 0 <= x1 < n and 0 <= y1 < n):
+                        continue
+                    cells = [(x0 + dx * i, y0 + dy * i) for i in range(k)]
+                    values = [rows[cy][cx] for cx, cy in cells]
+                    if values.count(symbol) == k - 2 and values.count('') == 2:
+                        moves.update(c for c, v in zip(cells, values) if v == '')
+        return moves
+
+    def vcf(self, board, symbol, depth):
+        # First move of a forced win by continuous threats, or None
+        self.nodes += 1
+        if depth == 0 or self.nodes > self.max_nodes:
+            return None
+        opp = other(symbol)
+        for x, y in self.threat_moves(board, symbol):
+            board.place(x, y, symbol)
+            wins = board.winning_cells_near(x, y, symbol)
+            found = False
+            if len(wins) >= 2:
+                found = True
+            elif len(wins) == 1:
+                bx, by = next(iter(wins))
+                board.place(bx, by, opp)
+                # A block that makes its own threat breaks the sequence
+                if not board.winning_cells_near(bx, by, opp) and board.winner_at(bx, by)[0] is None:
+                    found = self.vcf(board, symbol, depth - 1) is not None
+                board.undo()
+            board.undo()
+            if found:
+                return x, y
+        return None
+
+    def candidates(self, board):
+        # Empty cells next to existing stones (the centre on an empty board)
+        n, rows = board.n, board.rows
+        if not board.history:
+            return [(n // 2, n // 2)]
+        cells = set()
+        for sx, sy in board.history:
+            for dy in (-2, -1, 0, 1, 2):
+                for dx in (-2, -1, 0, 1, 2):
+                    x, y = sx + dx, sy + dy
+                    if 0 <= x < n and 0 <= y < n and rows[y][x] == '':
+                        cells.add((x, y))
+        return sorted(cells)
+
+    def score_cell(self, board, x, y, symbol):
+        # Sum over every K-window through the cell: open windows score by how many stones they hold
+        k, n, rows = board.k, board.n, board.rows
+        opp = other(symbol)
+        attack = defense = 0
+        for dx, dy in DIRECTIONS:
+            for offset in range(k):
+                x0, y0 = x - dx * offset, y - dy * offset
+                x1, y1 = x0 + dx * (k - 1), y0 + dy * (k - 1)
+                if not (0 <= x0 < n and 0 <= y0 < n and 0 <= x1 < n and 0 <= y1 < n):
+                    continue
+                values = [rows[y0 + dy * i][x0 + dx * i] for i in range(k)]
+                mine, theirs = values.count(symbol), values.count(opp)
+                if not theirs:
+                    attack += 4 ** mine
+                if not mine:
+                    defense += 4 ** theirs
+        return attack * 10 + defense * 9
+
+    def best_move(self, board, symbol):
+        opp = other(symbol)
+        cells = self.candidates(board)
+        # 1. win now, 2. block a win
+        for x, y in cells:
+            if board.is_winning_cell(x, y, symbol):
+                return x, y
+        for x, y in cells:
+            if board.is_winning_cell(x, y, opp):
+                return x, y
+        # 3. a forced win by threats, 4. break the opponent's forced win
+        self.nodes = 0
+        move = self.vcf(board, symbol, self.max_depth)
+        if move is not None:
+            return move
+        self.nodes = 0
+        threat = self.vcf(board, opp, self.max_depth)
+        if threat is not None:
+            return threat
+        # 5. best positional move
+        return max(cells, key=lambda c: self.score_cell(board, c[0], c[1], symbol))
+
+
+def make_player(n=3, k=3):
+    # Perfect play from the solved table on the classic board, threat-space search elsewhere
+    if n == 3 and k == 3:
+        return PerfectPlayer()
+    return ThreatSpacePlayer()